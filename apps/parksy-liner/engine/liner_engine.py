@@ -12,12 +12,20 @@ Output per image:
   {name}_combo_for_notes.png — Samsung Notes용 합성 (white BG)
   {name}_preview_debug.png   — 4-panel 디버그 프리뷰
   {name}_prompt.json         — AI 스타일링 프롬프트 메타
+
+Batch mode (directory or glob) fans images out over a process pool.
+Tiled mode (--strip) computes and writes the layers strip by strip.
 """
 
 import sys
 import os
+import glob
 import json
 import time
+import struct
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 try:
@@ -47,6 +55,27 @@ SHADE_COLOR = (0xC8, 0xC8, 0xC8)    # #C8C8C8
 SHADE_ALPHA_MIN = int(255 * 0.25)    # 63
 SHADE_ALPHA_MAX = int(255 * 0.45)    # 114
 
+# 출력 파일 접미사 (batch skip 판정 + 입력 필터에 사용)
+OUTPUT_SUFFIXES = (
+    "_line_rgba.png", "_shade_rgba.png", "_combo_for_notes.png",
+    "_preview_debug.png", "_prompt.json",
+)
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff')
+
+# 연산 정밀도: float32 (float64 대비 메모리 절반, ARM에서 대역폭 이득)
+COMPUTE_DTYPE = np.float32
+GRAY_WEIGHTS = (0.2989, 0.5870, 0.1140)
+
+# sigma가 이 값 이상이면 직접 컨볼루션(2·3σ+1 탭) 대신 box blur 3회 근사(픽셀당 O(1))
+BOX_BLUR_MIN_SIGMA = 3.0
+BOX_BLUR_PASSES = 3
+BOX_BLUR_BLOCK = 32    # cumsum 작업 단위 (행/열 수) — 캐시에 머무는 크기
+
+SHADE_SIGMA = 8.0
+
+# 타일(스트립) 모드: 한 번에 처리하는 캔버스 행 수 (4의 배수)
+TILE_ROWS = 256
+
 # XDoG parameters
 XDOG_SIGMA = 0.5
 XDOG_K = 1.6
@@ -54,6 +83,12 @@ XDOG_P = 20.0
 XDOG_EPSILON = 0.01
 XDOG_PHI = 10.0
 
+# Gaussian pyramid: 레벨마다 PYRAMID_SIGMA blur 후 2x2 평균으로 1/2 축소.
+# XDoG의 두 번째 scale(σ·k = 0.8)과 같아서 레벨 1은 XDoG blur를 그대로 재사용.
+PYRAMID_SIGMA = XDOG_SIGMA * XDOG_K
+PYRAMID_MIN_SIGMA = 1.5   # 축소 레벨에서 남는 blur가 이보다 작아지면 한 단계 위 레벨 사용
+PYRAMID_MAX_LEVEL = 3
+
 
 # ═══════════════════════════════════════════════════
 # Image I/O via Pillow
@@ -75,9 +110,112 @@ def write_rgb_png(path, rgb_array):
     Image.fromarray(rgb_array, 'RGB').save(path)
 
 
-def to_gray(rgb):
-    """RGB uint8 → grayscale float64 [0,1]."""
-    return np.dot(rgb.astype(np.float64), [0.2989, 0.5870, 0.1140]) / 255.0
+class PngStreamWriter:
+    """
+    PNG을 행 단위로 써 내려가는 writer (타일 모드용 — 전체 이미지를 메모리에 두지 않음).
+    행 필터는 Pillow/libpng처럼 행마다 None/Sub/Up/Avg/Paeth 중 합계가 가장 작은 것.
+    """
+
+    COLOR_TYPES = {'RGB': (2, 3), 'RGBA': (6, 4)}
+
+    def __init__(self, path, width, height, mode, level=6):
+        color_type, self.bpp = self.COLOR_TYPES[mode]
+        self.width, self.height = width, height
+        self.rows = 0
+        self._f = open(path, 'wb')
+        self._z = zlib.compressobj(level)
+        self._prev = np.zeros(width * self.bpp, dtype=np.uint8)
+        self._f.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self._f.write(struct.pack('>I', len(data)) + tag + data)
+        self._f.write(struct.pack('>I', zlib.crc32(tag + data)))
+
+    def write(self, rows):
+        """rows: (n, width, channels) uint8."""
+        raw = np.ascontiguousarray(rows, dtype=np.uint8).reshape(len(rows), -1)
+        for i in range(0, len(raw), 64):     # 필터 임시 배열을 작게 유지
+            part = raw[i:i + 64]
+            data = self._z.compress(_png_filter(part, self._prev, self.bpp))
+            if data:
+                self._chunk(b'IDAT', data)
+            self._prev = part[-1].copy()
+        self.rows += len(raw)
+
+    def close(self):
+        self._chunk(b'IDAT', self._z.flush())
+        self._chunk(b'IEND', b'')
+        self._f.close()
+        if self.rows != self.height:
+            raise ValueError(f"PNG expected {self.height} rows, got {self.rows}")
+
+
+def _png_filter(raw, prev, bpp):
+    """(n, L) uint8 → (n, L+1) filtered scanlines (adaptive filter per row)."""
+    cur = raw.astype(np.int16)
+    up = np.empty_like(cur)
+    up[0] = prev
+    up[1:] = cur[:-1]
+    left = np.zeros_like(cur)
+    left[:, bpp:] = cur[:, :-bpp]
+    upleft = np.zeros_like(cur)
+    upleft[:, bpp:] = up[:, :-bpp]
+
+    p = left + up - upleft
+    pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - upleft)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upleft))
+    predictors = (None, left, up, (left + up) >> 1, paeth)
+
+    out = np.empty((len(raw), raw.shape[1] + 1), dtype=np.uint8)
+    best = None
+    for ftype, pred in enumerate(predictors):
+        res = cur if pred is None else (cur - pred) & 0xFF
+        # 부호 있는 바이트로 본 절댓값 합 (libpng 휴리스틱)
+        cost = np.abs(res.astype(np.uint8).view(np.int8).astype(np.int32)).sum(axis=1)
+        pick = np.ones(len(raw), dtype=bool) if best is None else cost < best
+        best = cost if best is None else np.minimum(best, cost)
+        out[pick, 0] = ftype
+        out[pick, 1:] = res[pick]
+    return out.tobytes()
+
+
+def to_gray(rgb, out=None):
+    """RGB uint8 → grayscale float32 [0,1]."""
+    h, w = rgb.shape[:2]
+    if out is None:
+        out = np.empty((h, w), dtype=COMPUTE_DTYPE)
+    tmp = _scratch('tmp', (h, w))
+    np.multiply(rgb[:, :, 0], GRAY_WEIGHTS[0] / 255.0, out=out, dtype=COMPUTE_DTYPE)
+    for c in (1, 2):
+        np.multiply(rgb[:, :, c], GRAY_WEIGHTS[c] / 255.0, out=tmp, dtype=COMPUTE_DTYPE)
+        out += tmp
+    return out
+
+
+# ═══════════════════════════════════════════════════
+# Scratch buffers (float32, 재사용)
+# ═══════════════════════════════════════════════════
+
+# 슬롯 이름별로 한 번만 할당해 파이프라인 전체(배치 모드에선 이미지 간에도)에서 재사용.
+# 'mid'  : gaussian_blur 내부 (가로 pass 결과)
+# 'tmp'  : 모든 함수의 단기 임시 버퍼 — 다른 함수를 부르는 동안 들고 있지 말 것
+# 'tmp2' / 'tmp3' : 위 둘과 동시에 살아 있어야 하는 값
+# 'mask' : bool 마스크
+_WORKSPACE = {}
+
+
+def _scratch(slot, shape, dtype=COMPUTE_DTYPE):
+    key = (slot, tuple(shape), np.dtype(dtype).str)
+    buf = _WORKSPACE.get(key)
+    if buf is None:
+        buf = _WORKSPACE[key] = np.empty(shape, dtype=dtype)
+    return buf
+
+
+def clear_workspace():
+    """Release cached scratch buffers."""
+    _WORKSPACE.clear()
 
 
 # ═══════════════════════════════════════════════════
@@ -94,23 +232,189 @@ def _make_kernel_1d(sigma):
     return k / k.sum()
 
 
-def gaussian_blur(img, sigma):
-    """Separable Gaussian blur on 2D float64 array."""
+def _convolve_padded(padded, k, n):
+    """Σ k[i] · padded[:, i:i+n] — 좁은 가장자리 띠 / 작은 이미지용."""
+    acc = padded[:, 0:n] * k[0]
+    for i in range(1, len(k)):
+        acc += padded[:, i:i + n] * k[i]
+    return acc
+
+
+def _convolve_rows(src, k, out, tmp):
+    """
+    마지막 축 방향 1D 컨볼루션 (reflect 경계 = np.pad mode='reflect').
+    안쪽은 패딩 복사본 없이 슬라이스로 계산하고, 대칭 커널이라
+    양쪽 탭을 먼저 더해 곱셈을 절반으로 줄인다. 가장자리 r칸만 좁은 띠로 따로 계산.
+    """
+    n = src.shape[1]
+    r = len(k) // 2
+    if n <= 2 * r:
+        out[...] = _convolve_padded(np.pad(src, ((0, 0), (r, r)), mode='reflect'), k, n)
+        return out
+
+    np.multiply(src, k[r], out=out)
+    inner = out[:, r:n - r]
+    t = tmp[:, :n - 2 * r]
+    for d in range(1, r + 1):
+        np.add(src[:, r - d:n - r - d], src[:, r + d:n - r + d], out=t)
+        t *= k[r + d]
+        inner += t
+
+    # 가장자리: 출력 [0, r)은 입력 [0, 2r)만 참조 (오른쪽도 대칭)
+    left = np.pad(src[:, :2 * r], ((0, 0), (r, r)), mode='reflect')
+    out[:, :r] = _convolve_padded(left, k, r)
+    right = np.pad(src[:, n - 2 * r:], ((0, 0), (r, r)), mode='reflect')
+    out[:, n - r:] = _convolve_padded(right[:, r:], k, r)
+    return out
+
+
+def _box_sizes(sigma, n=BOX_BLUR_PASSES):
+    """
+    Box widths whose n-fold stack approximates a Gaussian of the given sigma
+    (W. Wells, 1986 / P. Kovesi, 2010). 홀수 폭 wl, wl+2 를 섞어 분산을 맞춘다.
+    """
+    w_ideal = np.sqrt(12.0 * sigma ** 2 / n + 1)
+    wl = int(np.floor(w_ideal))
+    if wl % 2 == 0:
+        wl -= 1
+    wu = wl + 2
+    m = round((12.0 * sigma ** 2 - n * wl ** 2 - 4 * n * wl - 3 * n) / (-4 * wl - 4))
+    return [wl if i < m else wu for i in range(n)]
+
+
+def _box_sum(src, radius, out, axis):
+    """
+    axis 방향 box 합 (reflect 경계). 누적합 차분이라 반경과 무관하게 픽셀당 O(1).
+    다른 축을 BOX_BLUR_BLOCK 단위로 잘라 처리 — 블록을 복사한 뒤 쓰므로
+    src is out (in-place) 허용. 정규화(÷폭)는 호출측에서 한 번에.
+    """
+    n = src.shape[axis]
+    width = 2 * radius + 1
+    pad = [(0, 0), (0, 0)]
+    pad[axis] = (radius, radius)
+    for b0 in range(0, src.shape[1 - axis], BOX_BLUR_BLOCK):
+        blk = np.s_[:, b0:b0 + BOX_BLUR_BLOCK] if axis == 0 else np.s_[b0:b0 + BOX_BLUR_BLOCK]
+        c = np.cumsum(np.pad(src[blk], pad, mode='reflect'), axis=axis)
+        if axis == 1:
+            c, o = c.T, out[blk].T
+        else:
+            o = out[blk]
+        # box[i] = c[i + 2r] - c[i - 1]  (c[-1] = 0)
+        o[0] = c[width - 1]
+        np.subtract(c[width:], c[:n - 1], out=o[1:])
+    return out
+
+
+def box_blur(img, sigma, out=None):
+    """Gaussian approximation by stacked box blurs (separable, in-place on out)."""
+    if out is None:
+        out = np.empty_like(img)
+    sizes = _box_sizes(sigma)
+    src = img
+    for axis in (1, 0):
+        for size in sizes:
+            _box_sum(src, size // 2, out, axis)
+            src = out
+    out *= 1.0 / float(np.prod(sizes)) ** 2
+    return out
+
+
+def gaussian_blur(img, sigma, out=None):
+    """Separable Gaussian blur on a 2D float array (dtype preserved).
+    Large sigma switches to the O(1)-per-pixel box approximation."""
+    if out is None:
+        out = np.empty_like(img)
     if sigma < 0.3:
-        return img.copy()
-    k = _make_kernel_1d(sigma)
-    pad = len(k) // 2
-    # Horizontal pass
-    padded = np.pad(img, ((0, 0), (pad, pad)), mode='reflect')
-    h_out = np.zeros_like(img)
-    for i in range(len(k)):
-        h_out += padded[:, i:i + img.shape[1]] * k[i]
-    # Vertical pass
-    padded = np.pad(h_out, ((pad, pad), (0, 0)), mode='reflect')
-    v_out = np.zeros_like(img)
-    for i in range(len(k)):
-        v_out += padded[i:i + img.shape[0], :] * k[i]
-    return v_out
+        out[...] = img
+        return out
+    if sigma >= BOX_BLUR_MIN_SIGMA:
+        return box_blur(img, sigma, out=out)
+    k = _make_kernel_1d(sigma).astype(img.dtype)
+    mid = _scratch('mid', img.shape, img.dtype)
+    tmp = _scratch('tmp', img.shape, img.dtype)
+    _convolve_rows(img, k, mid, tmp)            # Horizontal pass
+    _convolve_rows(mid.T, k, out.T, tmp.T)      # Vertical pass (전치 view, 복사 없음)
+    return out
+
+
+# ═══════════════════════════════════════════════════
+# Multi-scale blur cache (Gaussian pyramid)
+# ═══════════════════════════════════════════════════
+
+def _upsample_into(small, out, factor, strip=256):
+    """
+    Bilinear upsample (×factor) of a 2D float32 map into out, strip by strip.
+    small 픽셀 i ↔ out 픽셀 [i·factor, (i+1)·factor) — 홀수 크기에서도 스트립/전체가 같은 매핑.
+    """
+    h, w = out.shape
+    src = Image.fromarray(small, 'F')
+    for y0 in range(0, h, strip):
+        y1 = min(y0 + strip, h)
+        part = src.resize((w, y1 - y0), Image.BILINEAR,
+                          box=(0, y0 / factor, w / factor, y1 / factor))
+        out[y0:y1] = np.asarray(part)
+    return out
+
+
+class BlurPyramid:
+    """
+    이미지 하나에 대한 blur 결과 / 축소 레벨 캐시.
+    XDoG와 shade가 같은 인스턴스를 쓰면 같은 σ는 한 번만 계산되고,
+    큰 σ는 축소 레벨에서 blur한 뒤 원본 크기로 upsample한다.
+    """
+
+    def __init__(self, gray):
+        self.gray = gray
+        self._levels = [gray]
+        self._blurs = {}
+
+    @staticmethod
+    def level_sigma(n):
+        """Blur accumulated in level n, in full-resolution pixels."""
+        # 레벨마다 blur(σ_p · 2^i) + 2-px box 평균(분산 0.25 · 4^i)
+        return np.sqrt(sum((PYRAMID_SIGMA ** 2 + 0.25) * 4 ** i for i in range(n)))
+
+    def level(self, n):
+        """Level n: 1/2**n size, pre-blurred."""
+        while len(self._levels) <= n:
+            i = len(self._levels) - 1
+            src = self.blur(PYRAMID_SIGMA) if i == 0 else gaussian_blur(self._levels[i], PYRAMID_SIGMA)
+            self._levels.append(np.asarray(Image.fromarray(src, 'F').reduce(2)))
+        return self._levels[n]
+
+    def _pick_level(self, sigma):
+        """Coarsest level that still leaves >= PYRAMID_MIN_SIGMA of blur to do."""
+        n = 0
+        for cand in range(1, PYRAMID_MAX_LEVEL + 1):
+            acc = self.level_sigma(cand)
+            if acc >= sigma or np.sqrt(sigma ** 2 - acc ** 2) / 2 ** cand < PYRAMID_MIN_SIGMA:
+                break
+            n = cand
+        return n
+
+    def blur(self, sigma, out=None):
+        """
+        Full-resolution Gaussian blur of the source. Without `out` the result
+        is cached and shared (read-only); with `out` it is written there.
+        """
+        cached = self._blurs.get(sigma)
+        if cached is not None:
+            if out is None:
+                return cached
+            out[...] = cached
+            return out
+
+        n = self._pick_level(sigma)
+        if n == 0:
+            res = gaussian_blur(self.gray, sigma, out=out)
+        else:
+            rem = np.sqrt(sigma ** 2 - self.level_sigma(n) ** 2) / 2 ** n
+            small = gaussian_blur(self.level(n), rem)
+            res = out if out is not None else np.empty_like(self.gray)
+            _upsample_into(small, res, 2 ** n)
+        if out is None:
+            self._blurs[sigma] = res
+        return res
 
 
 # ═══════════════════════════════════════════════════
@@ -118,40 +422,58 @@ def gaussian_blur(img, sigma):
 # ═══════════════════════════════════════════════════
 
 def xdog_edge(gray, sigma=XDOG_SIGMA, k=XDOG_K,
-              epsilon=XDOG_EPSILON, phi=XDOG_PHI):
+              epsilon=XDOG_EPSILON, phi=XDOG_PHI, out=None, pyramid=None):
     """
     eXtended Difference of Gaussians.
-    Returns float64 [0,1]: 0 = strong edge, 1 = background.
+    Returns float32 [0,1]: 0 = strong edge, 1 = background.
     """
-    g1 = gaussian_blur(gray, sigma)
-    g2 = gaussian_blur(gray, sigma * k)
-    dog = g1 - g2
-
-    result = np.where(
-        dog >= epsilon,
-        1.0,
-        1.0 + np.tanh(phi * (dog - epsilon))
-    )
-    return np.clip(result, 0.0, 1.0)
+    if out is None:
+        out = np.empty_like(gray)
+    pyramid = pyramid or BlurPyramid(gray)
+    dog = pyramid.blur(sigma, out=out)
+    dog -= pyramid.blur(sigma * k)
+
+    # np.where(dog >= eps, 1, 1 + tanh(phi * (dog - eps))) 를 in-place로
+    flat = np.greater_equal(dog, epsilon, out=_scratch('mask', gray.shape, np.bool_))
+    dog -= epsilon
+    dog *= phi
+    np.tanh(dog, out=dog)
+    dog += 1.0
+    dog[flat] = 1.0
+    return np.clip(dog, 0.0, 1.0, out=dog)
 
 
 # ═══════════════════════════════════════════════════
 # Shade extraction
 # ═══════════════════════════════════════════════════
 
-def extract_shade(gray):
+def extract_shade(gray, out=None, pyramid=None):
     """
     Tonal shade map from grayscale.
-    Returns float64 [0,1]: higher = darker area.
+    Returns float32 [0,1]: higher = darker area.
     """
-    shade = 1.0 - gray
-    shade = gaussian_blur(shade, 8.0)
+    shade = shade_raw(gray, out=out, pyramid=pyramid)
+    return normalize_shade(shade, shade.min(), shade.max())
 
-    smin, smax = shade.min(), shade.max()
+
+def shade_raw(gray, out=None, pyramid=None):
+    """Darkness before normalization: 1 - blur(gray, SHADE_SIGMA)."""
+    # blur(1 - gray) == 1 - blur(gray) (정규화된 커널) → 반전 버퍼 불필요
+    # 캐시된 blur는 공유(read-only) — 항상 별도 버퍼에 받아서 in-place 처리
+    if out is None:
+        out = np.empty_like(gray)
+    pyramid = pyramid or BlurPyramid(gray)
+    shade = pyramid.blur(SHADE_SIGMA, out=out)
+    return np.subtract(1.0, shade, out=shade)
+
+
+def normalize_shade(shade, smin, smax):
+    """Stretch [smin, smax] → [0, 1] and drop faint shade (in-place)."""
     if smax - smin > 0.01:
-        shade = (shade - smin) / (smax - smin)
+        shade -= smin
+        shade *= 1.0 / (smax - smin)
     else:
-        shade = np.zeros_like(shade)
+        shade[...] = 0.0
 
     shade[shade < 0.2] = 0.0
     return shade
@@ -165,18 +487,40 @@ def letterbox_fit(pil_img, tw=CANVAS_W, th=CANVAS_H):
     """
     Pillow Image → resized + padded to (tw, th). Returns (PIL Image, scale, ox, oy).
     """
-    w, h = pil_img.size
-    scale = min(tw / w, th / h)
-    nw, nh = int(w * scale), int(h * scale)
+    scale, nw, nh, ox, oy = letterbox_geometry(pil_img.size, tw, th)
     resized = pil_img.resize((nw, nh), Image.LANCZOS)
 
     canvas = Image.new('RGB', (tw, th), (0, 0, 0))
-    ox = (tw - nw) // 2
-    oy = (th - nh) // 2
     canvas.paste(resized, (ox, oy))
     return canvas, scale, ox, oy
 
 
+def letterbox_geometry(size, tw=CANVAS_W, th=CANVAS_H):
+    """(w, h) → (scale, nw, nh, ox, oy)."""
+    w, h = size
+    scale = min(tw / w, th / h)
+    nw, nh = int(w * scale), int(h * scale)
+    return scale, nw, nh, (tw - nw) // 2, (th - nh) // 2
+
+
+def letterbox_rows(pil_img, y0, y1, tw=CANVAS_W, th=CANVAS_H):
+    """
+    Canvas rows [y0, y1) of letterbox_fit() as RGB uint8, without building
+    the whole canvas. Pillow의 resize(box=...)는 필터 지지 영역을 box 밖 원본에서
+    가져오므로 전체 resize와 같은 픽셀이 나온다.
+    """
+    w, h = pil_img.size
+    _, nw, nh, ox, oy = letterbox_geometry((w, h), tw, th)
+    rows = np.zeros((y1 - y0, tw, 3), dtype=np.uint8)
+    r0, r1 = max(y0, oy), min(y1, oy + nh)
+    if r1 > r0:
+        sy = h / nh
+        part = pil_img.resize((nw, r1 - r0), Image.LANCZOS,
+                              box=(0, (r0 - oy) * sy, w, (r1 - oy) * sy))
+        rows[r0 - y0:r1 - y0, ox:ox + nw] = np.asarray(part)
+    return rows
+
+
 # ═══════════════════════════════════════════════════
 # Build output layers
 # ═══════════════════════════════════════════════════
@@ -184,49 +528,81 @@ def letterbox_fit(pil_img, tw=CANVAS_W, th=CANVAS_H):
 def build_line_rgba(edge_map):
     """Edge map (0=edge,1=bg) → RGBA uint8."""
     h, w = edge_map.shape
-    strength = 1.0 - edge_map  # 1=strong edge
-    mask = strength > 0.1
+    strength = np.subtract(1.0, edge_map, out=_scratch('tmp', (h, w), edge_map.dtype))  # 1=strong edge
+    mask = np.greater(strength, 0.1, out=_scratch('mask', (h, w), np.bool_))
 
     rgba = np.zeros((h, w, 4), dtype=np.uint8)
     rgba[mask, 0] = LINE_COLOR[0]
     rgba[mask, 1] = LINE_COLOR[1]
     rgba[mask, 2] = LINE_COLOR[2]
 
-    alpha = strength * (LINE_ALPHA_MAX - LINE_ALPHA_MIN) + LINE_ALPHA_MIN
+    alpha = strength
+    alpha *= LINE_ALPHA_MAX - LINE_ALPHA_MIN
+    alpha += LINE_ALPHA_MIN
     alpha *= mask
-    rgba[:, :, 3] = np.clip(alpha, 0, 255).astype(np.uint8)
+    np.clip(alpha, 0, 255, out=alpha)
+    rgba[:, :, 3] = alpha
     return rgba
 
 
 def build_shade_rgba(shade_map):
     """Shade map → RGBA uint8."""
     h, w = shade_map.shape
-    mask = shade_map > 0.05
+    mask = np.greater(shade_map, 0.05, out=_scratch('mask', (h, w), np.bool_))
 
     rgba = np.zeros((h, w, 4), dtype=np.uint8)
     rgba[mask, 0] = SHADE_COLOR[0]
     rgba[mask, 1] = SHADE_COLOR[1]
     rgba[mask, 2] = SHADE_COLOR[2]
 
-    alpha = shade_map * (SHADE_ALPHA_MAX - SHADE_ALPHA_MIN) + SHADE_ALPHA_MIN * mask
-    rgba[:, :, 3] = np.clip(alpha, 0, 255).astype(np.uint8)
+    alpha = np.multiply(shade_map, SHADE_ALPHA_MAX - SHADE_ALPHA_MIN,
+                        out=_scratch('tmp', (h, w), shade_map.dtype))
+    alpha[mask] += SHADE_ALPHA_MIN
+    np.clip(alpha, 0, 255, out=alpha)
+    rgba[:, :, 3] = alpha
     return rgba
 
 
+def _over(base, rgba, c, alpha, tmp):
+    """base = base·(1-α) + rgba[..., c]·α  (2D float32, in-place)."""
+    np.subtract(rgba[:, :, c], base, out=tmp, dtype=COMPUTE_DTYPE)
+    tmp *= alpha
+    base += tmp
+    return base
+
+
 def build_combo(line_rgba, shade_rgba):
     """Line + shade composited on white background → RGB uint8."""
     h, w = line_rgba.shape[:2]
-    out = np.full((h, w, 3), 255, dtype=np.float32)
-
-    # Shade first
-    sa = shade_rgba[:, :, 3:4].astype(np.float32) / 255.0
-    out = out * (1.0 - sa) + shade_rgba[:, :, :3].astype(np.float32) * sa
-
-    # Lines on top
-    la = line_rgba[:, :, 3:4].astype(np.float32) / 255.0
-    out = out * (1.0 - la) + line_rgba[:, :, :3].astype(np.float32) * la
-
-    return np.clip(out, 0, 255).astype(np.uint8)
+    combo = np.empty((h, w, 3), dtype=np.uint8)
+
+    # 채널별 2D 버퍼로 합성 (full-size (H,W,3) float 임시 배열 없음)
+    sa = np.multiply(shade_rgba[:, :, 3], 1.0 / 255.0, out=_scratch('mid', (h, w)), dtype=COMPUTE_DTYPE)
+    la = np.multiply(line_rgba[:, :, 3], 1.0 / 255.0, out=_scratch('tmp2', (h, w)), dtype=COMPUTE_DTYPE)
+    val = _scratch('tmp3', (h, w))
+    tmp = _scratch('tmp', (h, w))
+    for c in range(3):
+        val.fill(255.0)
+        _over(val, shade_rgba, c, sa, tmp)    # Shade first
+        _over(val, line_rgba, c, la, tmp)     # Lines on top
+        np.clip(val, 0, 255, out=val)
+        combo[:, :, c] = val
+    return combo
+
+
+def _on_white(rgba):
+    """RGBA uint8 → RGB uint8 composited on white."""
+    h, w = rgba.shape[:2]
+    rgb = np.empty((h, w, 3), dtype=np.uint8)
+    alpha = np.multiply(rgba[:, :, 3], 1.0 / 255.0, out=_scratch('tmp2', (h, w)), dtype=COMPUTE_DTYPE)
+    val = _scratch('tmp3', (h, w))
+    tmp = _scratch('tmp', (h, w))
+    for c in range(3):
+        val.fill(255.0)
+        _over(val, rgba, c, alpha, tmp)
+        np.clip(val, 0, 255, out=val)
+        rgb[:, :, c] = val
+    return rgb
 
 
 def build_preview(original_np, line_rgba, shade_rgba, combo):
@@ -240,19 +616,9 @@ def build_preview(original_np, line_rgba, shade_rgba, combo):
     orig_q = _resize(original_np, 'RGB')
     combo_q = _resize(combo, 'RGB')
 
-    # Line on white
-    lr = _resize(line_rgba, 'RGBA')
-    la = lr[:, :, 3:4].astype(np.float32) / 255.0
-    line_vis = np.full((qh, qw, 3), 255, dtype=np.float32)
-    line_vis = line_vis * (1 - la) + lr[:, :, :3].astype(np.float32) * la
-    line_vis = np.clip(line_vis, 0, 255).astype(np.uint8)
-
-    # Shade on white
-    sr = _resize(shade_rgba, 'RGBA')
-    sa = sr[:, :, 3:4].astype(np.float32) / 255.0
-    shade_vis = np.full((qh, qw, 3), 255, dtype=np.float32)
-    shade_vis = shade_vis * (1 - sa) + sr[:, :, :3].astype(np.float32) * sa
-    shade_vis = np.clip(shade_vis, 0, 255).astype(np.uint8)
+    # Line / shade on white (채널별 2D float32 합성)
+    line_vis = _on_white(_resize(line_rgba, 'RGBA'))
+    shade_vis = _on_white(_resize(shade_rgba, 'RGBA'))
 
     top = np.hstack([orig_q, line_vis])
     bot = np.hstack([shade_vis, combo_q])
@@ -263,12 +629,13 @@ def build_preview(original_np, line_rgba, shade_rgba, combo):
 # Prompt JSON
 # ═══════════════════════════════════════════════════
 
-def build_prompt_json(input_path, name_noext, processing_time):
+def build_prompt_json(input_path, name_noext, processing_time, canvas=(CANVAS_W, CANVAS_H)):
+    canvas_w, canvas_h = canvas
     return {
         "version": "1.0.0",
         "engine": "parksy-liner",
         "source": {"filename": os.path.basename(input_path)},
-        "canvas": {"width": CANVAS_W, "height": CANVAS_H},
+        "canvas": {"width": canvas_w, "height": canvas_h},
         "outputs": {
             "line": f"{name_noext}_line_rgba.png",
             "shade": f"{name_noext}_shade_rgba.png",
@@ -287,7 +654,7 @@ def build_prompt_json(input_path, name_noext, processing_time):
         "prompt_template": (
             f"A detailed pencil sketch drawn with light gray lines (#C3C3C3) "
             f"on white paper, with subtle gray shading (#C8C8C8). "
-            f"Hand-drawn artistic style. Canvas {CANVAS_W}x{CANVAS_H}px."
+            f"Hand-drawn artistic style. Canvas {canvas_w}x{canvas_h}px."
         ),
     }
 
@@ -296,7 +663,11 @@ def build_prompt_json(input_path, name_noext, processing_time):
 # Main Pipeline
 # ═══════════════════════════════════════════════════
 
-def process(input_path, output_dir=None):
+def process(input_path, output_dir=None, verbose=True, canvas=None, strip_rows=None):
+    if strip_rows:
+        return process_tiled(input_path, output_dir, verbose, canvas=canvas, strip_rows=strip_rows)
+    log = print if verbose else (lambda *args, **kwargs: None)
+
     if not os.path.isfile(input_path):
         print(f"[ERROR] File not found: {input_path}")
         sys.exit(1)
@@ -309,74 +680,353 @@ def process(input_path, output_dir=None):
     t0 = time.time()
 
     # 1. Read
-    print(f"[1/7] Reading: {input_path}")
+    log(f"[1/7] Reading: {input_path}")
     pil_img = Image.open(input_path).convert('RGB')
-    print(f"  Original: {pil_img.size[0]}x{pil_img.size[1]}")
+    log(f"  Original: {pil_img.size[0]}x{pil_img.size[1]}")
 
     # 2. Letterbox
-    print(f"[2/7] Letterbox → {CANVAS_W}x{CANVAS_H}")
-    canvas_pil, scale, ox, oy = letterbox_fit(pil_img)
+    tw, th = canvas or (CANVAS_W, CANVAS_H)
+    log(f"[2/7] Letterbox → {tw}x{th}")
+    canvas_pil, scale, ox, oy = letterbox_fit(pil_img, tw, th)
     canvas_np = np.array(canvas_pil)
-    print(f"  Scale: {scale:.3f}, Offset: ({ox}, {oy})")
+    log(f"  Scale: {scale:.3f}, Offset: ({ox}, {oy})")
 
     # 3. Smooth (Pillow bilateral approximation: median + slight blur)
-    print("[3/7] Smoothing...")
+    log("[3/7] Smoothing...")
     smooth_pil = canvas_pil.filter(ImageFilter.MedianFilter(3))
     smooth_np = np.array(smooth_pil)
+    del smooth_pil, canvas_pil, pil_img
 
     # 4. XDoG
-    print("[4/7] XDoG edge detection...")
+    log("[4/7] XDoG edge detection...")
     gray = to_gray(smooth_np)
-    edge_map = xdog_edge(gray)
+    del smooth_np
+    pyramid = BlurPyramid(gray)     # XDoG·shade가 blur/축소 레벨을 공유
+    edge_map = xdog_edge(gray, pyramid=pyramid)
 
     # 5. Shade
-    print("[5/7] Shade extraction...")
-    shade_map = extract_shade(gray)
+    log("[5/7] Shade extraction...")
+    shade_map = extract_shade(gray, pyramid=pyramid)
+    del gray, pyramid
 
     # 6. Build layers
-    print("[6/7] Building layers...")
+    log("[6/7] Building layers...")
     line_rgba = build_line_rgba(edge_map)
     shade_rgba = build_shade_rgba(shade_map)
+    del edge_map, shade_map
     combo = build_combo(line_rgba, shade_rgba)
     preview = build_preview(canvas_np, line_rgba, shade_rgba, combo)
 
     t_proc = time.time() - t0
 
     # 7. Write
-    print("[7/7] Writing files...")
+    log("[7/7] Writing files...")
     paths = {}
 
     p = os.path.join(output_dir, f"{name_noext}_line_rgba.png")
     write_rgba_png(p, line_rgba)
     paths['line'] = p
-    print(f"  → {p}")
+    log(f"  → {p}")
 
     p = os.path.join(output_dir, f"{name_noext}_shade_rgba.png")
     write_rgba_png(p, shade_rgba)
     paths['shade'] = p
-    print(f"  → {p}")
+    log(f"  → {p}")
 
     p = os.path.join(output_dir, f"{name_noext}_combo_for_notes.png")
     write_rgb_png(p, combo)
     paths['combo'] = p
-    print(f"  → {p}")
+    log(f"  → {p}")
 
     p = os.path.join(output_dir, f"{name_noext}_preview_debug.png")
     write_rgb_png(p, preview)
     paths['preview'] = p
-    print(f"  → {p}")
+    log(f"  → {p}")
 
     p = os.path.join(output_dir, f"{name_noext}_prompt.json")
     with open(p, 'w', encoding='utf-8') as f:
-        json.dump(build_prompt_json(input_path, name_noext, t_proc), f, indent=2, ensure_ascii=False)
+        json.dump(build_prompt_json(input_path, name_noext, t_proc, canvas=(tw, th)), f, indent=2, ensure_ascii=False)
     paths['prompt'] = p
-    print(f"  → {p}")
+    log(f"  → {p}")
 
     t_total = time.time() - t0
-    print(f"\n[DONE] Process: {t_proc:.2f}s | Total: {t_total:.2f}s | Files: {len(paths)}")
+    log(f"\n[DONE] Process: {t_proc:.2f}s | Total: {t_total:.2f}s | Files: {len(paths)}")
     return paths
 
 
+# ═══════════════════════════════════════════════════
+# Tiled mode (strip by strip, bounded memory)
+# ═══════════════════════════════════════════════════
+
+class _RowFile:
+    """임시 파일에 행 단위로 쌓아 두고 [y0, y1) 구간만 다시 읽는 저장소 (RAM 대신 디스크)."""
+
+    def __init__(self, path, row_shape, dtype):
+        self.row_shape = tuple(row_shape)
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = int(np.prod(row_shape)) * self.dtype.itemsize
+        self._f = open(path, 'w+b')
+
+    def append(self, rows):
+        self._f.seek(0, 2)
+        self._f.write(memoryview(np.ascontiguousarray(rows, dtype=self.dtype)).cast('B'))
+
+    def read(self, y0, y1):
+        rows = np.empty((y1 - y0,) + self.row_shape, dtype=self.dtype)
+        self._f.seek(y0 * self.row_bytes)
+        self._f.readinto(memoryview(rows).cast('B'))
+        return rows
+
+    def close(self):
+        self._f.close()
+
+
+def _resize_box(arr, mode, size, box):
+    return np.array(Image.fromarray(arr, mode).resize(size, Image.LANCZOS, box=box))
+
+
+def _strips(height, rows):
+    for y0 in range(0, height, rows):
+        yield y0, min(y0 + rows, height)
+
+
+def _tile_halos():
+    """
+    스트립 위/아래로 더 읽는 행 수 — 각 단계 blur 반경에 맞춤.
+    shade: σ=8 blur 반경 + pyramid 사전 blur·upsample 여유 (피라미드 정렬 위해 4의 배수)
+    xdog : 큰 쪽 σ(0.8)의 커널 반경
+    preview: 1/2 LANCZOS 축소의 필터 지지 영역(3 × 2) + 경계 여유
+    """
+    shade = int(np.ceil(3 * SHADE_SIGMA)) * 2
+    shade = (shade + 3) // 4 * 4
+    xdog = int(np.ceil(3 * XDOG_SIGMA * XDOG_K))
+    preview = 3 * 2 + 2
+    return shade, xdog, preview
+
+
+def process_tiled(input_path, output_dir=None, verbose=True, canvas=None, strip_rows=TILE_ROWS):
+    """
+    process()와 같은 출력(리샘플 반올림 ±1 수준 차이)을 캔버스 높이와 무관한 메모리로 생성.
+    3-pass: (1) letterbox·smooth·gray → 임시 파일, (2) shade + 전역 min/max,
+    (3) XDoG·레이어 합성 → PNG를 스트립 단위로 기록.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+
+    if not os.path.isfile(input_path):
+        print(f"[ERROR] File not found: {input_path}")
+        sys.exit(1)
+
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(input_path)) or '.'
+    os.makedirs(output_dir, exist_ok=True)
+
+    tw, th = canvas or (CANVAS_W, CANVAS_H)
+    strip_rows = max(4, strip_rows // 4 * 4)
+    shade_halo, xdog_halo, preview_halo = _tile_halos()
+    name_noext = os.path.splitext(os.path.basename(input_path))[0]
+    paths = {key: os.path.join(output_dir, name_noext + suffix)
+             for key, suffix in zip(('line', 'shade', 'combo', 'preview', 'prompt'), OUTPUT_SUFFIXES)}
+    t0 = time.time()
+
+    log(f"[1/4] Reading: {input_path}")
+    pil_img = Image.open(input_path).convert('RGB')
+    scale, _, _, ox, oy = letterbox_geometry(pil_img.size, tw, th)
+    log(f"  Original: {pil_img.size[0]}x{pil_img.size[1]} → {tw}x{th} "
+        f"(scale {scale:.3f}, offset ({ox}, {oy})), {strip_rows}-row strips")
+
+    with tempfile.TemporaryDirectory(prefix='liner_') as tmp:
+        canvas_rows = _RowFile(os.path.join(tmp, 'canvas.u8'), (tw, 3), np.uint8)
+        gray_rows = _RowFile(os.path.join(tmp, 'gray.f32'), (tw,), COMPUTE_DTYPE)
+        shade_rows = _RowFile(os.path.join(tmp, 'shade.f32'), (tw,), COMPUTE_DTYPE)
+        qw, qh = tw // 2, th // 2
+        bottom_rows = _RowFile(os.path.join(tmp, 'preview_bottom.u8'), (2 * qw, 3), np.uint8)
+
+        # Pass 1: letterbox + smooth (median 3x3 → 1행 halo) + gray
+        log("[2/4] Letterbox, smoothing, gray...")
+        for y0, y1 in _strips(th, strip_rows):
+            a, b = max(0, y0 - 1), min(th, y1 + 1)
+            rgb = letterbox_rows(pil_img, a, b, tw, th)
+            canvas_rows.append(rgb[y0 - a:y1 - a])
+            smooth = np.asarray(Image.fromarray(rgb, 'RGB').filter(ImageFilter.MedianFilter(3)))
+            gray_rows.append(to_gray(smooth[y0 - a:y1 - a]))
+        del pil_img, rgb, smooth
+        clear_workspace()   # 스트립 shape별 scratch는 pass 단위로만 유지
+
+        # Pass 2: shade (정규화 전) + 전역 min/max
+        log("[3/4] Shade extraction...")
+        smin, smax = np.inf, -np.inf
+        for y0, y1 in _strips(th, strip_rows):
+            a, b = max(0, y0 - shade_halo), min(th, y1 + shade_halo)
+            raw = shade_raw(gray_rows.read(a, b))[y0 - a:y1 - a]
+            smin, smax = min(smin, raw.min()), max(smax, raw.max())
+            shade_rows.append(raw)
+        clear_workspace()
+
+        # Pass 3: XDoG + layers, 행 단위 PNG 기록
+        log("[4/4] XDoG edges, layers, writing...")
+        writers = {
+            'line': PngStreamWriter(paths['line'], tw, th, 'RGBA'),
+            'shade': PngStreamWriter(paths['shade'], tw, th, 'RGBA'),
+            'combo': PngStreamWriter(paths['combo'], tw, th, 'RGB'),
+            'preview': PngStreamWriter(paths['preview'], 2 * qw, 2 * qh, 'RGB'),
+        }
+        sy = th / qh
+        for y0, y1 in _strips(th, strip_rows):
+            # 레이어는 preview 축소에 필요한 halo까지 계산, 파일엔 [y0, y1)만 기록
+            a, b = max(0, y0 - preview_halo), min(th, y1 + preview_halo)
+            ga, gb = max(0, a - xdog_halo), min(th, b + xdog_halo)
+            edge = xdog_edge(gray_rows.read(ga, gb))[a - ga:b - ga]
+            shade = normalize_shade(shade_rows.read(a, b), smin, smax)
+            line_rgba = build_line_rgba(edge)
+            shade_rgba = build_shade_rgba(shade)
+            combo = build_combo(line_rgba, shade_rgba)
+            inner = slice(y0 - a, y1 - a)
+            writers['line'].write(line_rgba[inner])
+            writers['shade'].write(shade_rgba[inner])
+            writers['combo'].write(combo[inner])
+
+            # preview 출력 행 [o0, o1) ↔ 캔버스 행 [o0·sy, o1·sy) (전체 resize와 같은 매핑)
+            o0, o1 = y0 * qh // th, y1 * qh // th
+            if o1 > o0:
+                size, box = (qw, o1 - o0), (0, o0 * sy - a, tw, o1 * sy - a)
+                writers['preview'].write(np.hstack([
+                    _resize_box(canvas_rows.read(a, b), 'RGB', size, box),
+                    _on_white(_resize_box(line_rgba, 'RGBA', size, box)),
+                ]))
+                bottom_rows.append(np.hstack([
+                    _on_white(_resize_box(shade_rgba, 'RGBA', size, box)),
+                    _resize_box(combo, 'RGB', size, box),
+                ]))
+
+        for o0, o1 in _strips(qh, strip_rows):
+            writers['preview'].write(bottom_rows.read(o0, o1))
+        for w in writers.values():
+            w.close()
+        for f in (canvas_rows, gray_rows, shade_rows, bottom_rows):
+            f.close()
+        clear_workspace()
+
+    t_proc = time.time() - t0
+    with open(paths['prompt'], 'w', encoding='utf-8') as f:
+        json.dump(build_prompt_json(input_path, name_noext, t_proc, canvas=(tw, th)),
+                  f, indent=2, ensure_ascii=False)
+    for p in paths.values():
+        log(f"  → {p}")
+
+    log(f"\n[DONE] Total: {time.time() - t0:.2f}s | Files: {len(paths)} | Strips: {strip_rows} rows")
+    return paths
+
+
+# ═══════════════════════════════════════════════════
+# Batch mode (directory / glob → process pool)
+# ═══════════════════════════════════════════════════
+
+def collect_inputs(target):
+    """Directory or glob pattern → sorted image paths (engine outputs excluded)."""
+    if os.path.isdir(target):
+        candidates = [os.path.join(target, n) for n in os.listdir(target)]
+    else:
+        candidates = glob.glob(target)
+    return sorted(
+        p for p in candidates
+        if os.path.isfile(p)
+        and p.lower().endswith(IMAGE_EXTS)
+        and not p.endswith(OUTPUT_SUFFIXES)
+    )
+
+
+def is_up_to_date(input_path, output_dir=None, canvas=None):
+    """All outputs exist, are newer than the input and were made for this canvas."""
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(input_path)) or '.'
+    name_noext = os.path.splitext(os.path.basename(input_path))[0]
+    src_mtime = os.path.getmtime(input_path)
+    for suffix in OUTPUT_SUFFIXES:
+        out = os.path.join(output_dir, name_noext + suffix)
+        if not os.path.exists(out) or os.path.getmtime(out) < src_mtime:
+            return False
+
+    # 캔버스 크기가 바뀌었으면 다시 처리 (prompt.json에 기록된 값과 비교)
+    tw, th = canvas or (CANVAS_W, CANVAS_H)
+    try:
+        with open(os.path.join(output_dir, name_noext + "_prompt.json"), encoding='utf-8') as f:
+            recorded = json.load(f)["canvas"]
+        return (recorded["width"], recorded["height"]) == (tw, th)
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+
+def _batch_worker(input_path, output_dir, canvas=None, strip_rows=None):
+    t0 = time.time()
+    try:
+        process(input_path, output_dir, verbose=False, canvas=canvas, strip_rows=strip_rows)
+    except Exception as e:
+        return input_path, time.time() - t0, f"{type(e).__name__}: {e}"
+    return input_path, time.time() - t0, None
+
+
+def _make_pool(jobs):
+    # Termux 등 sem_open 미지원 환경에서는 풀 생성이 실패 → 순차 처리로 폴백
+    try:
+        return ProcessPoolExecutor(max_workers=jobs)
+    except (ImportError, NotImplementedError, OSError) as e:
+        print(f"  [WARN] Process pool unavailable ({e}); running serially")
+        return None
+
+
+def process_batch(target, output_dir=None, jobs=None, force=False, canvas=None, strip_rows=None):
+    """
+    Convert every image in a directory/glob. Workers import numpy/Pillow once
+    and handle many images, so per-image startup cost disappears.
+    Returns {"done": [...], "skipped": [...], "failed": [(path, error)]}.
+    """
+    inputs = collect_inputs(target)
+    if not inputs:
+        print(f"[ERROR] No images found: {target}")
+        sys.exit(1)
+
+    todo = [p for p in inputs if force or not is_up_to_date(p, output_dir, canvas)]
+    skipped = [p for p in inputs if p not in todo]
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(todo) or 1))
+
+    print(f"[BATCH] {len(inputs)} images | {len(skipped)} up to date | "
+          f"{len(todo)} to process | {jobs} workers")
+
+    summary = {"done": [], "skipped": skipped, "failed": []}
+    t0 = time.time()
+    pool = _make_pool(jobs) if jobs > 1 and len(todo) > 1 else None
+
+    if pool is None:
+        results = (_batch_worker(p, output_dir, canvas, strip_rows) for p in todo)
+    else:
+        futures = [pool.submit(_batch_worker, p, output_dir, canvas, strip_rows) for p in todo]
+        results = (f.result() for f in as_completed(futures))
+
+    try:
+        for i, (path, elapsed, error) in enumerate(results, 1):
+            name = os.path.basename(path)
+            if error:
+                summary["failed"].append((path, error))
+                print(f"  [{i}/{len(todo)}] FAIL {name}: {error}")
+            else:
+                summary["done"].append(path)
+                print(f"  [{i}/{len(todo)}] {name} ({elapsed:.2f}s)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    wall = time.time() - t0
+    done = len(summary["done"])
+    rate = done / wall if wall > 0 else 0.0
+    per_image = wall / done if done else 0.0
+    tw, th = canvas or (CANVAS_W, CANVAS_H)
+    mpix = done * tw * th / 1e6 / wall if wall > 0 else 0.0
+    print(f"\n[BATCH DONE] {done} done | {len(skipped)} skipped | "
+          f"{len(summary['failed'])} failed | {wall:.2f}s wall")
+    print(f"  Throughput: {rate:.2f} img/s | {per_image:.2f}s/img | {mpix:.1f} MPix/s (canvas)")
+    return summary
+
+
 # ═══════════════════════════════════════════════════
 # CLI
 # ═══════════════════════════════════════════════════
@@ -385,7 +1035,17 @@ def main():
     if len(sys.argv) < 2 or sys.argv[1] in ('--help', '-h'):
         print("""Parksy Liner Engine — Photo → Sketch
 
-Usage: python liner_engine.py <image> [output_dir]
+Usage: python liner_engine.py <image> [output_dir] [--canvas WxH] [--strip N]
+       python liner_engine.py <dir | "glob*"> [output_dir] [--jobs N] [--force]
+
+Options:
+  --canvas WxH     output canvas size (default: 2160x3060)
+  --strip N        tiled mode: process/write N canvas rows at a time, so
+                   memory stays bounded for large (print) canvases
+
+Batch mode (directory or glob):
+  --jobs N, -j N   worker processes (default: CPU core count)
+  --force          re-process even if outputs are up to date
 
 Output:
   {name}_line_rgba.png        Line art (transparent BG)
@@ -395,7 +1055,37 @@ Output:
   {name}_prompt.json          AI prompt metadata""")
         sys.exit(0)
 
-    process(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    args = []
+    jobs = None
+    force = False
+    canvas = None
+    strip_rows = None
+    argv = sys.argv[1:]
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg in ('--jobs', '-j') and i + 1 < len(argv):
+            jobs = int(argv[i + 1])
+            i += 1
+        elif arg == '--force':
+            force = True
+        elif arg == '--canvas' and i + 1 < len(argv):
+            canvas = tuple(int(v) for v in argv[i + 1].lower().split('x'))
+            i += 1
+        elif arg == '--strip' and i + 1 < len(argv):
+            strip_rows = int(argv[i + 1])
+            i += 1
+        else:
+            args.append(arg)
+        i += 1
+
+    target = args[0]
+    output_dir = args[1] if len(args) > 1 else None
+    if os.path.isdir(target) or glob.has_magic(target):
+        process_batch(target, output_dir, jobs=jobs, force=force,
+                      canvas=canvas, strip_rows=strip_rows)
+    else:
+        process(target, output_dir, canvas=canvas, strip_rows=strip_rows)
 
 
 if __name__ == '__main__':
@@ -5,6 +5,78 @@ import tempfile
 APP_SECRET = os.environ.get("APP_SECRET", "")
 GOOGLE_APPLICATION_CREDENTIALS_JSON = os.environ.get("GOOGLE_APPLICATION_CREDENTIALS_JSON", "")
 
+TTS_CONCURRENCY = int(os.environ.get("TTS_CONCURRENCY", "4"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.environ.get("JOB_QUEUE_MAX", "20"))
+TTS_MAX_TEXT_CHARS = int(os.environ.get("TTS_MAX_TEXT_CHARS", "20000"))
+NDJSON_MAX_ITEMS = int(os.environ.get("NDJSON_MAX_ITEMS", "10000"))
+JOB_WINDOW_ITEMS = int(os.environ.get("JOB_WINDOW_ITEMS", "50"))
+
+TTS_CLIENT_POOL_SIZE = int(os.environ.get("TTS_CLIENT_POOL_SIZE", "2"))
+TTS_WARMUP = os.environ.get("TTS_WARMUP", "1") == "1"
+TTS_CALL_TIMEOUT = float(os.environ.get("TTS_CALL_TIMEOUT", "30"))
+TTS_RETRY_INITIAL = float(os.environ.get("TTS_RETRY_INITIAL", "0.5"))
+TTS_RETRY_MAXIMUM = float(os.environ.get("TTS_RETRY_MAXIMUM", "8"))
+TTS_RETRY_TIMEOUT = float(os.environ.get("TTS_RETRY_TIMEOUT", "90"))
+
+# "google" or "fake"; the fake backend is a local stand-in for benchmarks.
+TTS_BACKEND = os.environ.get("TTS_BACKEND", "google")
+FAKE_TTS_LATENCY = float(os.environ.get("FAKE_TTS_LATENCY", "0.2"))
+FAKE_TTS_JITTER = float(os.environ.get("FAKE_TTS_JITTER", "0.05"))
+FAKE_TTS_ERROR_RATE = float(os.environ.get("FAKE_TTS_ERROR_RATE", "0"))
+FAKE_TTS_SEED = int(os.environ.get("FAKE_TTS_SEED", "0"))
+
+# The cache, finished work dirs (JOB_DISK_MAX_BYTES) and running archives
+# (up to JOB_ARCHIVE_MAX_BYTES per worker) share the temp dir. Where that is
+# memory, as on Cloud Run, their sum plus the process must fit the instance;
+# the deploy workflow sizes them for 512Mi.
+TTS_CACHE_DIR = os.environ.get(
+    "TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts_cache")
+)
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+TTS_DOWNLOAD_MODE = os.environ.get("TTS_DOWNLOAD_MODE", "file")
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+# Signed download links: the key defaults to APP_SECRET, and a base URL
+# (e.g. a CDN in front of this service) may replace the app's own origin.
+DOWNLOAD_TOKEN_SECRET = os.environ.get("DOWNLOAD_TOKEN_SECRET", "")
+DOWNLOAD_TOKEN_TTL = int(os.environ.get("DOWNLOAD_TOKEN_TTL", "300"))
+DOWNLOAD_BASE_URL = os.environ.get("DOWNLOAD_BASE_URL", "").rstrip("/")
+
+EVENTS_POLL_SECONDS = float(os.environ.get("EVENTS_POLL_SECONDS", "1.0"))
+EVENTS_KEEPALIVE_SECONDS = float(os.environ.get("EVENTS_KEEPALIVE_SECONDS", "15"))
+
+ARTIFACT_RETENTION_SECONDS = float(os.environ.get("ARTIFACT_RETENTION_SECONDS", "900"))
+JOB_TTL_SECONDS = float(os.environ.get("JOB_TTL_SECONDS", "3600"))
+JOB_MAX_AGE_SECONDS = float(os.environ.get("JOB_MAX_AGE_SECONDS", str(6 * 3600)))
+JOB_DISK_MAX_BYTES = int(os.environ.get("JOB_DISK_MAX_BYTES", str(256 * 1024 * 1024)))
+# Ceiling on one job's on-disk archive (0 = none). Work dirs live under the
+# temp dir, which is memory on Cloud Run, and running jobs are never evicted.
+JOB_ARCHIVE_MAX_BYTES = int(os.environ.get("JOB_ARCHIVE_MAX_BYTES", str(128 * 1024 * 1024)))
+JOB_REAP_INTERVAL = float(os.environ.get("JOB_REAP_INTERVAL", "60"))
+
+IDEMPOTENCY_WINDOW_SECONDS = float(os.environ.get("IDEMPOTENCY_WINDOW_SECONDS", "600"))
+
+# Number of proxies in front of the server that append to X-Forwarded-For
+# (1 on Cloud Run). The caller is the entry that many hops from the right;
+# anything further left is client-supplied and not trusted.
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+
+# Each worker process records a heartbeat in the job store; unfinished jobs
+# whose owner has been silent for WORKER_DEAD_SECONDS are taken over (queued)
+# or failed (processing) by a live worker.
+WORKER_HEARTBEAT_SECONDS = float(os.environ.get("WORKER_HEARTBEAT_SECONDS", "15"))
+WORKER_DEAD_SECONDS = float(os.environ.get("WORKER_DEAD_SECONDS", "60"))
+
+# The SQLite store is local to one instance. Jobs survive a restart (and
+# queued ones are picked up again) only if JOB_STORE_PATH is on storage that
+# outlives the container; it is not shared between instances.
+JOB_STORE_BACKEND = os.environ.get("JOB_STORE_BACKEND", "sqlite")
+JOB_STORE_PATH = os.environ.get(
+    "JOB_STORE_PATH", os.path.join(tempfile.gettempdir(), "tts_jobs.db")
+)
+
 _credentials_file = None
 
 
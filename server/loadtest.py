@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Load test for the TTS job API.
+
+Submits jobs to /v1/jobs from concurrent workers, waits for each to finish,
+optionally downloads the archive, then reports throughput and latency
+percentiles. Run the server against the local fake backend to benchmark
+without calling Google:
+
+  TTS_BACKEND=fake FAKE_TTS_LATENCY=0.2 APP_SECRET=dev \\
+      uvicorn main:app --port 8080
+  python3 loadtest.py --secret dev --jobs 50 --concurrency 8 --items 10
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+FILLER = "오늘의 문장을 천천히 읽어 봅니다. "
+
+
+def _request(url, secret, method="GET", body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(url, data=data, method=method)
+    req.add_header("x-app-secret", secret)
+    if data is not None:
+        req.add_header("Content-Type", "application/json")
+    return urllib.request.urlopen(req, timeout=60)
+
+
+def run_job(args, n):
+    items = [
+        {"id": f"item{i}", "text": f"{n}-{i}. " + FILLER * args.repeat}
+        for i in range(args.items)
+    ]
+    if args.shared_text:
+        for item in items:
+            item["text"] = FILLER * args.repeat
+    # A distinct batch_date per job and per run keeps the server's duplicate
+    # submission check from answering with an earlier job, which would count
+    # one job's work N times (notably with --shared-text).
+    body = {"batch_date": f"loadtest-{args.run_id}-{n}", "preset": args.preset, "items": items}
+    stats = {"rejected": 0}
+
+    started = time.perf_counter()
+    while True:
+        try:
+            with _request(f"{args.url}/v1/jobs", args.secret, "POST", body) as resp:
+                job_id = json.load(resp)["job_id"]
+            break
+        except urllib.error.HTTPError as e:
+            if e.code != 429:
+                raise
+            stats["rejected"] += 1
+            time.sleep(min(float(e.headers.get("Retry-After", "1")), args.max_backoff))
+    stats["submit"] = time.perf_counter() - started
+
+    while True:
+        with _request(f"{args.url}/v1/jobs/{job_id}", args.secret) as resp:
+            status = json.load(resp)
+        if status["status"] in ("completed", "failed"):
+            break
+        time.sleep(args.poll)
+    stats["complete"] = time.perf_counter() - started
+    stats["status"] = status["status"]
+    stats["cache_hits"] = status.get("cache_hits", 0)
+
+    stats["bytes"] = 0
+    if args.download and status["status"] == "completed":
+        with _request(f"{args.url}/v1/jobs/{job_id}/download", args.secret) as resp:
+            while True:
+                chunk = resp.read(1024 * 1024)
+                if not chunk:
+                    break
+                stats["bytes"] += len(chunk)
+        stats["download"] = time.perf_counter() - started - stats["complete"]
+    return stats
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def print_series(name, values):
+    print(f"  {name:<10} p50 {percentile(values, 50):7.3f}s  p90 {percentile(values, 90):7.3f}s  "
+          f"p99 {percentile(values, 99):7.3f}s  max {max(values, default=0):7.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the TTS job API")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--secret", default=os.environ.get("APP_SECRET", ""))
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=4, help="filler sentences per item")
+    parser.add_argument("--preset", default="neutral")
+    parser.add_argument("--shared-text", action="store_true", help="every item uses the same text")
+    parser.add_argument("--poll", type=float, default=0.2)
+    parser.add_argument("--max-backoff", type=float, default=2.0, help="cap on Retry-After waits")
+    parser.add_argument("--download", action="store_true")
+    args = parser.parse_args()
+    args.url = args.url.rstrip("/")
+    args.run_id = f"{time.time():.0f}"
+
+    started = time.perf_counter()
+    results, errors = [], []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_job, args, n) for n in range(args.jobs)]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors.append(str(e))
+    elapsed = time.perf_counter() - started
+
+    completed = [r for r in results if r["status"] == "completed"]
+    print(f"jobs: {len(completed)} completed, {len(results) - len(completed)} failed, "
+          f"{len(errors)} errors in {elapsed:.2f}s")
+    print(f"throughput: {len(completed) / elapsed:.2f} jobs/s, "
+          f"{len(completed) * args.items / elapsed:.2f} items/s")
+    print(f"rejected (429): {sum(r['rejected'] for r in results)}, "
+          f"cache hits: {sum(r['cache_hits'] for r in results)}")
+    print("latency:")
+    print_series("submit", [r["submit"] for r in results])
+    print_series("complete", [r["complete"] for r in results])
+    if args.download:
+        print_series("download", [r["download"] for r in completed])
+        print(f"downloaded: {sum(r['bytes'] for r in completed) / 1e6:.1f} MB")
+    for error in errors[:5]:
+        print(f"  error: {error}")
+    if errors or len(completed) < len(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
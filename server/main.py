@@ -1,51 +1,191 @@
+import os
+import time
 import uuid
 from datetime import datetime
-from fastapi import FastAPI, Header, HTTPException, BackgroundTasks
-from fastapi.responses import StreamingResponse
-from config import APP_SECRET, init_google_credentials
-from models import JobRequest, JobCreateResponse, JobStatusResponse, JobStatus
-from services.job_runner import create_job, get_job, run_job, cleanup_job
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from config import (
+    DOWNLOAD_BASE_URL, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_TOKEN_TTL, TRUSTED_PROXY_HOPS,
+    TTS_WARMUP, init_google_credentials
+)
+from models import (
+    DownloadTokenResponse, JobRequest, JobCreateResponse, JobStatusResponse, JobStatus
+)
+from services import metrics, tts_cache
+from services.auth import SecretAuthMiddleware, signed_download_query
+from services.google_tts import warm_clients
+from services.job_events import job_event_stream
+from services.http_range import RangeNotSatisfiable, parse_byte_range
+from services.item_spool import ItemSpool, SpoolError
+from services.idempotency import IdempotencyConflict, find_job, fingerprint
+from services.job_runner import (
+    create_job, get_job, get_results, cleanup_job, mark_downloaded, stream_job_zip
+)
+from services.reaper import JobReaper
+from services.scheduler import QueueFull, get_scheduler
 
 init_google_credentials()
 
 app = FastAPI(title="TTS Factory", version="1.0")
+app.add_middleware(SecretAuthMiddleware)
 
 MAX_ITEMS = 25
 
 
-def verify_secret(x_app_secret: str = Header(...)):
-    if x_app_secret != APP_SECRET:
-        raise HTTPException(status_code=401, detail="Invalid app secret")
+scheduler = get_scheduler()
+reaper = JobReaper()
 
+metrics.Gauge("tts_active_jobs", "Jobs currently running.",
+              lambda: scheduler.stats()["active_jobs"])
+metrics.Gauge("tts_queue_depth", "Jobs waiting for a worker.",
+              lambda: scheduler.stats()["queue_depth"])
+metrics.Gauge("tts_temp_dir_bytes", "Bytes held in per-job work dirs.",
+              metrics.temp_dir_bytes)
+metrics.Gauge("tts_cache_bytes", "Bytes held in the synthesis cache.",
+              tts_cache.total_bytes)
 
+
+@app.on_event("startup")
+def start_workers():
+    reaper.start()
+    # Also adopts jobs accepted by a previous process on a persistent store
+    # once its heartbeat has gone stale.
+    scheduler.start()
+    if TTS_WARMUP:
+        warm_clients()
+
+
+@app.on_event("shutdown")
+def stop_workers():
+    scheduler.stop()
+    reaper.stop()
+
+
+def _client_address(http_request: Request) -> str:
+    # Behind a proxy the TCP peer is the proxy itself, so every caller
+    # would share one queue; use the address the last trusted hop saw.
+    if TRUSTED_PROXY_HOPS > 0:
+        hops = [
+            h.strip() for h in http_request.headers.get("x-forwarded-for", "").split(",")
+            if h.strip()
+        ]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return http_request.client.host if http_request.client else ""
+
+
+def _submitter(http_request: Request, x_submitter: str) -> str:
+    return x_submitter or _client_address(http_request)
+
+
+def _new_job_id() -> str:
+    timestamp = datetime.now().strftime("%Y%m%d")
+    short_id = uuid.uuid4().hex[:4]
+    return f"job_{timestamp}_{short_id}"
+
+
+def _replay(response: Response, submitter: str, body_fingerprint: str,
+            idempotency_key: Optional[str]) -> Optional[JobCreateResponse]:
+    # Retries of the same submission get the original job back instead of
+    # paying for synthesis twice.
+    try:
+        existing_id = find_job(submitter, body_fingerprint, idempotency_key)
+    except IdempotencyConflict:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used with a different request"
+        )
+    existing = get_job(existing_id) if existing_id else None
+    if not existing:
+        return None
+    response.headers["Idempotent-Replayed"] = "true"
+    return JobCreateResponse(job_id=existing_id, status=existing["status"])
+
+
+def _enqueue(job_id: str, submitter: str):
+    try:
+        scheduler.submit(job_id, submitter)
+    except QueueFull as e:
+        cleanup_job(job_id)
+        raise HTTPException(
+            status_code=429,
+            detail="Job queue is full",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+# Routes that touch the job store are plain functions, which FastAPI runs in
+# its threadpool: a store call can wait on SQLite's write lock while runner
+# threads record progress, and must not hold up the event loop meanwhile.
 @app.post("/v1/jobs", response_model=JobCreateResponse, status_code=202)
-async def create_tts_job(
+def create_tts_job(
     request: JobRequest,
-    background_tasks: BackgroundTasks,
-    x_app_secret: str = Header(...)
+    http_request: Request,
+    response: Response,
+    x_submitter: str = Header(""),
+    idempotency_key: Optional[str] = Header(None)
 ):
-    verify_secret(x_app_secret)
-
     if len(request.items) > MAX_ITEMS:
         raise HTTPException(
             status_code=400,
             detail=f"Maximum {MAX_ITEMS} items allowed per batch"
         )
 
-    timestamp = datetime.now().strftime("%Y%m%d")
-    short_id = uuid.uuid4().hex[:4]
-    job_id = f"job_{timestamp}_{short_id}"
+    submitter = _submitter(http_request, x_submitter)
+    body_fingerprint = fingerprint(request)
+    replay = _replay(response, submitter, body_fingerprint, idempotency_key)
+    if replay:
+        return replay
 
-    create_job(job_id, request)
-    background_tasks.add_task(run_job, job_id)
+    job_id = _new_job_id()
+    create_job(job_id, request, submitter, body_fingerprint, idempotency_key)
+    _enqueue(job_id, submitter)
 
     return JobCreateResponse(job_id=job_id, status=JobStatus.QUEUED)
 
 
-@app.get("/v1/jobs/{job_id}", response_model=JobStatusResponse)
-async def get_job_status(job_id: str, x_app_secret: str = Header(...)):
-    verify_secret(x_app_secret)
+@app.post("/v1/jobs/ndjson", response_model=JobCreateResponse, status_code=202)
+async def create_tts_job_ndjson(
+    http_request: Request,
+    response: Response,
+    x_submitter: str = Header(""),
+    idempotency_key: Optional[str] = Header(None)
+):
+    # Line-delimited submission without the MAX_ITEMS cap: a header line
+    # with the job options, then one item per line. Items are validated and
+    # spooled to disk as they arrive instead of being parsed as one body.
+    submitter = _submitter(http_request, x_submitter)
+    job_id = _new_job_id()
+    spool = ItemSpool(job_id)
+    try:
+        async for chunk in http_request.stream():
+            spool.feed(chunk)
+        body_fingerprint = spool.finish()
+        replay = await run_in_threadpool(
+            _replay, response, submitter, body_fingerprint, idempotency_key
+        )
+    except SpoolError as e:
+        spool.discard()
+        raise HTTPException(status_code=422, detail=str(e))
+    except BaseException:
+        spool.discard()
+        raise
+    if replay:
+        spool.discard()
+        return replay
 
+    await run_in_threadpool(
+        create_job, job_id, spool.header, submitter, body_fingerprint, idempotency_key, spool
+    )
+    await run_in_threadpool(_enqueue, job_id, submitter)
+
+    return JobCreateResponse(job_id=job_id, status=JobStatus.QUEUED)
+
+
+@app.get("/v1/jobs/{job_id}", response_model=JobStatusResponse)
+def get_job_status(job_id: str):
     job = get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -53,14 +193,49 @@ async def get_job_status(job_id: str, x_app_secret: str = Header(...)):
     return JobStatusResponse(
         status=job["status"],
         progress=job["progress"],
-        total=job["total"]
+        total=job["total"],
+        cache_hits=job["cache_hits"],
+        cache_misses=job["cache_misses"],
+        deduplicated=job["deduplicated"]
     )
 
 
-@app.get("/v1/jobs/{job_id}/download")
-async def download_job(job_id: str, x_app_secret: str = Header(...)):
-    verify_secret(x_app_secret)
+@app.get("/v1/jobs/{job_id}/events")
+def stream_job_events(job_id: str):
+    if not get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return StreamingResponse(
+        job_event_stream(job_id, get_job, get_results),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/v1/jobs/{job_id}/download-token", response_model=DownloadTokenResponse)
+def create_download_token(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["status"] != JobStatus.COMPLETED:
+        raise HTTPException(status_code=400, detail="Job not completed")
+
+    path = f"/v1/jobs/{job_id}/download"
+    query, expires = signed_download_query(path, DOWNLOAD_TOKEN_TTL)
+    return DownloadTokenResponse(
+        download_url=f"{DOWNLOAD_BASE_URL}{path}?{query}",
+        expires_at=expires
+    )
+
 
+@app.get("/v1/jobs/{job_id}/download")
+def download_job(
+    job_id: str,
+    http_request: Request,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None)
+):
     job = get_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
@@ -68,23 +243,79 @@ async def download_job(job_id: str, x_app_secret: str = Header(...)):
     if job["status"] != JobStatus.COMPLETED:
         raise HTTPException(status_code=400, detail="Job not completed")
 
+    headers = {"Content-Disposition": f"attachment; filename={job_id}.zip"}
+
+    # Stream-mode archives are rebuilt per request and are not guaranteed
+    # byte-identical, so they are served whole.
+    if job.get("download_mode") == "stream":
+        chunks = stream_job_zip(job_id, job)
+        if chunks is None:
+            raise HTTPException(status_code=404, detail="Job audio not found")
+        headers["Accept-Ranges"] = "none"
+        return StreamingResponse(
+            chunks,
+            media_type="application/zip",
+            headers=headers
+        )
+
     zip_path = job.get("zip_path")
-    if not zip_path:
+    if not zip_path or not os.path.exists(zip_path):
         raise HTTPException(status_code=404, detail="ZIP file not found")
 
+    st = os.stat(zip_path)
+    size = st.st_size
+    etag = f'"{job_id}-{size:x}-{st.st_mtime_ns:x}"'
+    headers["ETag"] = etag
+    headers["Accept-Ranges"] = "bytes"
+    # A signed link names one immutable artifact until it expires, so a
+    # CDN in front of the app may serve it from cache.
+    signed_expires = getattr(http_request.state, "signed_download_expires", None)
+    if signed_expires:
+        max_age = max(0, signed_expires - int(time.time()))
+        headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+
+    byte_range = None
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except RangeNotSatisfiable:
+            raise HTTPException(
+                status_code=416,
+                detail="Range not satisfiable",
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+
+    start, end = byte_range if byte_range else (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
     def iter_file():
         with open(zip_path, "rb") as f:
-            while chunk := f.read(8192):
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
                 yield chunk
-        cleanup_job(job_id)
+        if end == size - 1:
+            mark_downloaded(job_id)
 
     return StreamingResponse(
         iter_file(),
+        status_code=206 if byte_range else 200,
         media_type="application/zip",
-        headers={"Content-Disposition": f"attachment; filename={job_id}.zip"}
+        headers=headers
     )
 
 
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    return {"status": "ok", **scheduler.stats()}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from enum import Enum
 
@@ -10,16 +10,47 @@ class JobStatus(str, Enum):
     FAILED = "failed"
 
 
+class AudioFormat(str, Enum):
+    MP3 = "mp3"
+    OGG_OPUS = "ogg_opus"
+    LINEAR16 = "linear16"
+
+
+# Languages and presets with a voice in google_tts.VOICE_PRESETS; anything
+# else is rejected at validation rather than read by a fallback voice.
+class Language(str, Enum):
+    KO = "ko"
+    EN = "en"
+    JA = "ja"
+    ZH = "zh"
+    ES = "es"
+
+
+class VoicePreset(str, Enum):
+    NEUTRAL = "neutral"
+    CALM = "calm"
+    BRIGHT = "bright"
+
+
 class TTSItem(BaseModel):
     id: str
     text: str
-    max_chars: int = 1100
+    max_chars: int = Field(1100, gt=0)
+    ssml: bool = False
+    preset: Optional[VoicePreset] = None
+    language: Optional[Language] = None
 
 
 class JobRequest(BaseModel):
     batch_date: str
-    preset: str = "neutral"
+    preset: VoicePreset = VoicePreset.NEUTRAL
+    language: Language = Language.KO
+    audio_format: AudioFormat = AudioFormat.MP3
+    # The range the TTS API synthesizes at; anything else would fail every
+    # item and still get cache entries of its own.
+    sample_rate_hertz: Optional[int] = Field(None, ge=8000, le=48000)
     items: List[TTSItem]
+    dedupe_archive: bool = False
 
 
 class JobCreateResponse(BaseModel):
@@ -31,9 +62,19 @@ class JobStatusResponse(BaseModel):
     status: JobStatus
     progress: int
     total: int
+    cache_hits: int = 0
+    cache_misses: int = 0
+    deduplicated: int = 0
 
 
 class JobResult(BaseModel):
     item_id: str
     success: bool
     error: Optional[str] = None
+    cached: bool = False
+    duplicate_of: Optional[str] = None
+
+
+class DownloadTokenResponse(BaseModel):
+    download_url: str
+    expires_at: int
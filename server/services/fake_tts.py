@@ -0,0 +1,135 @@
+import random
+import re
+import struct
+import threading
+import time
+from collections import Counter
+from typing import List, Tuple
+from google.api_core import exceptions
+from google.cloud import texttospeech_v1beta1 as texttospeech
+from config import FAKE_TTS_ERROR_RATE, FAKE_TTS_JITTER, FAKE_TTS_LATENCY, FAKE_TTS_SEED
+from services.ogg import page_crc
+
+# Stand-in for TextToSpeechClient that never leaves the process. Audio is
+# silence whose length follows the text, so archives have realistic sizes,
+# and latency/failures are drawn from a generator seeded per call so runs
+# are repeatable regardless of thread scheduling.
+
+SECONDS_PER_CHAR = 0.06
+
+# MPEG-2 Layer III, 32 kbps, 24 kHz, mono: 96-byte frames of 24 ms. An
+# all-zero frame body decodes to silence.
+_MP3_FRAME = b"\xff\xf3\x44\xc0" + bytes(92)
+_MP3_FRAME_SECONDS = 576 / 24000
+
+# Opus "silence" packet (CELT, 20 ms) and the matching stream headers.
+_OPUS_PACKET = b"\xf8\xff\xfe"
+_OPUS_PRESKIP = 312
+_OPUS_HEAD = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, _OPUS_PRESKIP, 48000, 0, 0)
+_OPUS_TAGS = b"OpusTags" + struct.pack("<I", 4) + b"fake" + struct.pack("<I", 0)
+
+_MARK = re.compile(r"<mark\s+name=[\"']([^\"']*)[\"']\s*/>")
+_TAG = re.compile(r"<[^>]+>")
+
+
+def _ogg_page(flags: int, granule: int, seq: int, packets: List[bytes]) -> bytes:
+    lacing = bytearray()
+    for packet in packets:
+        lacing += b"\xff" * (len(packet) // 255) + bytes([len(packet) % 255])
+    page = bytearray(b"OggS\x00")
+    page.append(flags)
+    page += struct.pack("<qIII", granule, 1, seq, 0)
+    page.append(len(lacing))
+    page += lacing
+    for packet in packets:
+        page += packet
+    struct.pack_into("<I", page, 22, page_crc(page))
+    return bytes(page)
+
+
+def silent_mp3(seconds: float) -> bytes:
+    return _MP3_FRAME * max(1, round(seconds / _MP3_FRAME_SECONDS))
+
+
+def silent_wav(seconds: float, sample_rate: int) -> bytes:
+    samples = bytes(2 * max(1, int(seconds * sample_rate)))
+    fmt = struct.pack("<HHIIHH", 1, 1, sample_rate, sample_rate * 2, 2, 16)
+    body = b"WAVEfmt " + struct.pack("<I", len(fmt)) + fmt
+    body += b"data" + struct.pack("<I", len(samples)) + samples
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def silent_ogg_opus(seconds: float) -> bytes:
+    pages = [_ogg_page(0x02, 0, 0, [_OPUS_HEAD]), _ogg_page(0, 0, 1, [_OPUS_TAGS])]
+    packets = max(1, round(seconds / 0.02))
+    granule = _OPUS_PRESKIP
+    for start in range(0, packets, 50):
+        count = min(50, packets - start)
+        granule += count * 960
+        flags = 0x04 if start + count >= packets else 0
+        pages.append(_ogg_page(flags, granule, len(pages), [_OPUS_PACKET] * count))
+    return b"".join(pages)
+
+
+def _spoken_text(ssml: str) -> Tuple[str, List[Tuple[str, int]]]:
+    # Returns the text with markup removed plus (mark, offset) pairs.
+    text, marks, pos = [], [], 0
+    for part in re.split(r"(<[^>]+>)", ssml):
+        mark = _MARK.fullmatch(part)
+        if mark:
+            marks.append((mark.group(1), pos))
+        elif not _TAG.fullmatch(part):
+            text.append(part)
+            pos += len(part)
+    return "".join(text), marks
+
+
+class FakeTextToSpeechClient:
+    def __init__(self):
+        self._calls = Counter()
+        self._lock = threading.Lock()
+
+    def _draw(self, key: str) -> random.Random:
+        with self._lock:
+            self._calls[key] += 1
+            attempt = self._calls[key]
+        return random.Random(f"{FAKE_TTS_SEED}:{key}:{attempt}")
+
+    def list_voices(self, *args, **kwargs):
+        return texttospeech.ListVoicesResponse()
+
+    def synthesize_speech(self, request=None, retry=None, timeout=None, **kwargs):
+        # Injected errors go through the caller's retry policy just as they
+        # would on the real client.
+        if retry is not None:
+            return retry(self._synthesize)(request)
+        return self._synthesize(request)
+
+    def _synthesize(self, request):
+        source = request.input.ssml or request.input.text
+        rng = self._draw(source)
+        time.sleep(max(0.0, FAKE_TTS_LATENCY + rng.uniform(-FAKE_TTS_JITTER, FAKE_TTS_JITTER)))
+        if rng.random() < FAKE_TTS_ERROR_RATE:
+            raise exceptions.ServiceUnavailable("fake backend: injected failure")
+
+        if request.input.ssml:
+            text, marks = _spoken_text(request.input.ssml)
+        else:
+            text, marks = request.input.text, []
+        seconds = len(text) * SECONDS_PER_CHAR
+
+        encoding = request.audio_config.audio_encoding
+        if encoding == texttospeech.AudioEncoding.LINEAR16:
+            audio = silent_wav(seconds, request.audio_config.sample_rate_hertz or 24000)
+        elif encoding == texttospeech.AudioEncoding.OGG_OPUS:
+            audio = silent_ogg_opus(seconds)
+        else:
+            audio = silent_mp3(seconds)
+
+        response = texttospeech.SynthesizeSpeechResponse(audio_content=audio)
+        if request.enable_time_pointing:
+            for name, offset in marks:
+                response.timepoints.append(texttospeech.Timepoint(
+                    mark_name=name, time_seconds=offset * SECONDS_PER_CHAR
+                ))
+        return response
@@ -1,41 +1,245 @@
-from google.cloud import texttospeech
+import itertools
+import json
+import logging
+import threading
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+from google.api_core import exceptions, retry
+# v1beta1 is a superset of v1 and the only surface that returns SSML
+# mark timepoints.
+from google.cloud import texttospeech_v1beta1 as texttospeech
+from google.cloud.texttospeech_v1beta1.services.text_to_speech.transports import (
+    TextToSpeechGrpcTransport
+)
+from config import (
+    TTS_BACKEND, TTS_CALL_TIMEOUT, TTS_CLIENT_POOL_SIZE, TTS_RETRY_INITIAL,
+    TTS_RETRY_MAXIMUM, TTS_RETRY_TIMEOUT
+)
+from models import AudioFormat
+from services import tts_cache
+from services.fake_tts import FakeTextToSpeechClient
+from services.metrics import AUDIO_BYTES, SYNTH_SECONDS
+
+logger = logging.getLogger(__name__)
 
 VOICE_PRESETS = {
-    "neutral": "ko-KR-Neural2-A",
-    "calm": "ko-KR-Neural2-B",
-    "bright": "ko-KR-Neural2-C"
+    "ko": {
+        "neutral": "ko-KR-Neural2-A",
+        "calm": "ko-KR-Neural2-B",
+        "bright": "ko-KR-Neural2-C",
+    },
+    "en": {
+        "neutral": "en-US-Neural2-D",
+        "calm": "en-US-Neural2-A",
+        "bright": "en-US-Neural2-F",
+    },
+    "ja": {
+        "neutral": "ja-JP-Neural2-B",
+        "calm": "ja-JP-Neural2-C",
+        "bright": "ja-JP-Neural2-D",
+    },
+    "zh": {
+        "neutral": "zh-CN-Neural2-A",
+        "calm": "zh-CN-Neural2-B",
+        "bright": "zh-CN-Neural2-C",
+    },
+    "es": {
+        "neutral": "es-ES-Neural2-A",
+        "calm": "es-ES-Neural2-B",
+        "bright": "es-ES-Neural2-C",
+    },
+}
+
+LANG_CODES = {
+    "ko": "ko-KR",
+    "en": "en-US",
+    "ja": "ja-JP",
+    "zh": "zh-CN",
+    "es": "es-ES",
+}
+
+DEFAULT_LANGUAGE = "ko"
+
+# Output format -> (encoding, archive file extension).
+AUDIO_FORMATS = {
+    AudioFormat.MP3: (texttospeech.AudioEncoding.MP3, "mp3"),
+    AudioFormat.OGG_OPUS: (texttospeech.AudioEncoding.OGG_OPUS, "ogg"),
+    AudioFormat.LINEAR16: (texttospeech.AudioEncoding.LINEAR16, "wav"),
 }
 
-_client = None
+# Full-jitter exponential backoff (api_core draws each sleep uniformly from
+# [0, current cap]) on codes that are worth retrying.
+SYNTH_RETRY = retry.Retry(
+    predicate=retry.if_exception_type(
+        exceptions.ServiceUnavailable,
+        exceptions.DeadlineExceeded,
+        exceptions.ResourceExhausted,
+        exceptions.InternalServerError,
+        exceptions.Aborted,
+    ),
+    initial=TTS_RETRY_INITIAL,
+    maximum=TTS_RETRY_MAXIMUM,
+    multiplier=2.0,
+    timeout=TTS_RETRY_TIMEOUT,
+)
+
+_CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+    ("grpc.max_receive_message_length", -1),
+]
+
+_clients: List[texttospeech.TextToSpeechClient] = []
+_clients_lock = threading.Lock()
+_next_client = itertools.count()
+
+
+def _new_client() -> texttospeech.TextToSpeechClient:
+    if TTS_BACKEND == "fake":
+        return FakeTextToSpeechClient()
+    channel = TextToSpeechGrpcTransport.create_channel(options=_CHANNEL_OPTIONS)
+    return texttospeech.TextToSpeechClient(
+        transport=TextToSpeechGrpcTransport(channel=channel)
+    )
+
+
+def get_client() -> texttospeech.TextToSpeechClient:
+    # Each pooled client owns its own channel, so concurrent items are
+    # spread across connections round-robin.
+    if not _clients:
+        with _clients_lock:
+            if not _clients:
+                _clients.extend(_new_client() for _ in range(max(1, TTS_CLIENT_POOL_SIZE)))
+    return _clients[next(_next_client) % len(_clients)]
+
+
+def warm_clients():
+    # Builds the pool and makes one cheap call per channel so the first
+    # job after a cold start does not pay for connection and token setup.
+    try:
+        get_client()
+        for client in list(_clients):
+            client.list_voices(language_code="ko-KR", timeout=TTS_CALL_TIMEOUT)
+    except Exception as e:
+        logger.warning("TTS client warm-up failed: %s", e)
+
 
+class VoiceProfile:
+    # Request objects are built once per voice and output format and shared
+    # by every call.
+    def __init__(self, language: str, preset: str, audio_format: AudioFormat,
+                 sample_rate_hertz: Optional[int]):
+        self.language = language
+        self.preset = preset
+        self.voice_name = VOICE_PRESETS[language][preset]
+        self.audio_format = audio_format
+        encoding, self.extension = AUDIO_FORMATS[audio_format]
+        self.encoding_tag = encoding.name
+        if sample_rate_hertz:
+            self.encoding_tag += f"@{sample_rate_hertz}"
+        self.params = texttospeech.VoiceSelectionParams(
+            language_code=LANG_CODES[self.language],
+            name=self.voice_name
+        )
+        self.audio_config = texttospeech.AudioConfig(
+            audio_encoding=encoding,
+            sample_rate_hertz=sample_rate_hertz or 0
+        )
 
-def get_client():
-    global _client
-    if _client is None:
-        _client = texttospeech.TextToSpeechClient()
-    return _client
 
+_voices: Dict[Tuple, VoiceProfile] = {}
+_voices_lock = threading.Lock()
 
-def synthesize_text(text: str, preset: str = "neutral") -> bytes:
+
+def get_voice(preset: str = "neutral", language: str = DEFAULT_LANGUAGE,
+              audio_format: AudioFormat = AudioFormat.MP3,
+              sample_rate_hertz: Optional[int] = None) -> VoiceProfile:
+    # Requests are validated against models.Language/VoicePreset; a miss
+    # here is a bug, not something to paper over with another voice.
+    if language not in VOICE_PRESETS:
+        raise ValueError(f"Unsupported language: {language}")
+    if preset not in VOICE_PRESETS[language]:
+        raise ValueError(f"Unsupported preset for {language}: {preset}")
+    key = (language, preset, audio_format, sample_rate_hertz)
+    voice = _voices.get(key)
+    if voice is None:
+        with _voices_lock:
+            voice = _voices.setdefault(
+                key, VoiceProfile(language, preset, audio_format, sample_rate_hertz)
+            )
+    return voice
+
+
+def _synthesize(synthesis_input, voice: VoiceProfile, **kwargs):
     client = get_client()
 
-    voice_name = VOICE_PRESETS.get(preset, VOICE_PRESETS["neutral"])
+    with SYNTH_SECONDS.time():
+        response = client.synthesize_speech(
+            request=texttospeech.SynthesizeSpeechRequest(
+                input=synthesis_input,
+                voice=voice.params,
+                audio_config=voice.audio_config,
+                **kwargs
+            ),
+            retry=SYNTH_RETRY,
+            timeout=TTS_CALL_TIMEOUT
+        )
+
+    AUDIO_BYTES.inc(amount=len(response.audio_content))
+    return response
 
+
+def synthesize_text(text: str, voice: VoiceProfile) -> bytes:
     synthesis_input = texttospeech.SynthesisInput(text=text)
+    return _synthesize(synthesis_input, voice).audio_content
 
-    voice = texttospeech.VoiceSelectionParams(
-        language_code="ko-KR",
-        name=voice_name
-    )
 
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.MP3
+def synthesize_ssml(ssml: str, voice: VoiceProfile) -> Tuple[bytes, List[dict]]:
+    """Return (audio, timepoints) with one timepoint per <mark> in the SSML."""
+    response = _synthesize(
+        texttospeech.SynthesisInput(ssml=ssml),
+        voice,
+        enable_time_pointing=[texttospeech.SynthesizeSpeechRequest.TimepointType.SSML_MARK]
     )
+    timepoints = [
+        {"mark_name": tp.mark_name, "time_seconds": tp.time_seconds}
+        for tp in response.timepoints
+    ]
+    return response.audio_content, timepoints
 
-    response = client.synthesize_speech(
-        input=synthesis_input,
-        voice=voice,
-        audio_config=audio_config
-    )
 
-    return response.audio_content
+def audio_cache_key(text: str, voice: VoiceProfile) -> str:
+    return tts_cache.cache_key(text, voice.voice_name, voice.encoding_tag)
+
+
+def synthesize_cached(text: str, voice: VoiceProfile) -> Tuple[Union[bytes, BinaryIO], bool]:
+    """Return (audio, cache_hit); a hit is an open handle on the cached entry."""
+    key = audio_cache_key(text, voice)
+
+    cached = tts_cache.open_entry(key)
+    if cached is not None:
+        return cached, True
+
+    audio_bytes = synthesize_text(text, voice)
+    tts_cache.put(key, audio_bytes)
+    return audio_bytes, False
+
+
+def synthesize_ssml_cached(ssml: str, voice: VoiceProfile) -> Tuple[Union[bytes, BinaryIO], List[dict], bool]:
+    """Return (audio, timepoints, cache_hit) for an SSML document."""
+    key = tts_cache.cache_key(ssml, voice.voice_name, f"{voice.encoding_tag}/ssml")
+    marks_key = tts_cache.cache_key(ssml, voice.voice_name, f"{voice.encoding_tag}/ssml/timepoints")
+
+    marks = tts_cache.open_entry(marks_key)
+    if marks is not None:
+        with marks:
+            timepoints = json.loads(marks.read())
+        cached = tts_cache.open_entry(key)
+        if cached is not None:
+            return cached, timepoints, True
+
+    audio_bytes, timepoints = synthesize_ssml(ssml, voice)
+    tts_cache.put(key, audio_bytes)
+    tts_cache.put(marks_key, json.dumps(timepoints).encode("utf-8"))
+    return audio_bytes, timepoints, False
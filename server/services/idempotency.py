@@ -0,0 +1,46 @@
+import hashlib
+import json
+import time
+from typing import Optional
+from config import IDEMPOTENCY_WINDOW_SECONDS
+from models import JobRequest, JobStatus
+from services.job_store import get_job_store
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+store = get_job_store()
+
+
+def fingerprint(request: JobRequest) -> str:
+    body = json.dumps(request.model_dump(mode="json"), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def find_job(submitter: str, body_fingerprint: str, idempotency_key: Optional[str] = None) -> Optional[str]:
+    """Return the job_id of an earlier equivalent submission, if any.
+
+    An Idempotency-Key matches across submitters for as long as its job
+    exists: a retry often arrives from a new address (and so a different
+    default submitter), and every client shares one app secret anyway. An
+    identical body from the same submitter matches within the idempotency
+    window. Failed jobs are never reused. Lookups read the job store itself,
+    so a retry reaching another worker on the same store finds the original.
+    """
+    if idempotency_key:
+        for job_id, job in store.find(idempotency_key=idempotency_key):
+            if job["status"] == JobStatus.FAILED:
+                continue
+            if job.get("fingerprint") != body_fingerprint:
+                raise IdempotencyConflict(idempotency_key)
+            return job_id
+
+    now = time.time()
+    for job_id, job in store.find(submitter=submitter, fingerprint=body_fingerprint):
+        if now - job.get("created_at", 0.0) > IDEMPOTENCY_WINDOW_SECONDS:
+            break
+        if job["status"] != JobStatus.FAILED:
+            return job_id
+    return None
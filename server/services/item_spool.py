@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+from config import NDJSON_MAX_ITEMS, TTS_MAX_TEXT_CHARS
+from models import JobRequest, TTSItem
+
+# A line carries one item; anything far beyond the text limit is not one.
+MAX_LINE_BYTES = TTS_MAX_TEXT_CHARS * 4 + 64 * 1024
+
+
+class SpoolError(ValueError):
+    pass
+
+
+class ItemSpool:
+    """Validate an NDJSON submission line by line into a file on disk.
+
+    The first line holds the job options (every JobRequest field except
+    items); each following line is one TTSItem.
+    """
+
+    def __init__(self, job_id: str):
+        self.work_dir = tempfile.mkdtemp(prefix=f"tts_{job_id}_")
+        self.path = os.path.join(self.work_dir, "items.ndjson")
+        self.header: Optional[JobRequest] = None
+        self.count = 0
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._digest = hashlib.sha256()
+        self._pending = b""
+        self._line_no = 0
+
+    def feed(self, chunk: bytes):
+        self._digest.update(chunk)
+        *lines, self._pending = (self._pending + chunk).split(b"\n")
+        for line in lines:
+            self._add_line(line)
+        if len(self._pending) > MAX_LINE_BYTES:
+            raise SpoolError(f"Line {self._line_no + 1} exceeds {MAX_LINE_BYTES} bytes")
+
+    def finish(self) -> str:
+        """Flush the last line and return a fingerprint of the raw body."""
+        if self._pending.strip():
+            self._add_line(self._pending)
+        self._pending = b""
+        self._file.close()
+        if self.header is None:
+            raise SpoolError("Missing job header line")
+        if not self.count:
+            raise SpoolError("No items submitted")
+        return self._digest.hexdigest()
+
+    def discard(self):
+        self._file.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _add_line(self, raw: bytes):
+        self._line_no += 1
+        if not raw.strip():
+            return
+        try:
+            data = json.loads(raw)
+            if self.header is None:
+                self.header = JobRequest.model_validate({**data, "items": []})
+                return
+            item = TTSItem.model_validate(data)
+        except (TypeError, ValueError) as e:
+            raise SpoolError(f"Line {self._line_no}: {e}")
+        self.count += 1
+        if self.count > NDJSON_MAX_ITEMS:
+            raise SpoolError(f"Maximum {NDJSON_MAX_ITEMS} items allowed per streamed batch")
+        self._file.write(item.model_dump_json() + "\n")
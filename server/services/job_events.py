@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from config import EVENTS_KEEPALIVE_SECONDS, EVENTS_POLL_SECONDS
+from models import JobStatus
+
+_lock = threading.Lock()
+_subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+
+def notify(job_id: str):
+    # Called from runner threads; wakes every stream watching this job.
+    with _lock:
+        targets = list(_subscribers.get(job_id, ()))
+    for loop, event in targets:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass
+
+
+def _subscribe(job_id: str) -> Tuple[asyncio.AbstractEventLoop, asyncio.Event]:
+    entry = (asyncio.get_running_loop(), asyncio.Event())
+    with _lock:
+        _subscribers.setdefault(job_id, set()).add(entry)
+    return entry
+
+
+def _unsubscribe(job_id: str, entry: Tuple[asyncio.AbstractEventLoop, asyncio.Event]):
+    with _lock:
+        subscribers = _subscribers.get(job_id)
+        if subscribers is not None:
+            subscribers.discard(entry)
+            if not subscribers:
+                del _subscribers[job_id]
+
+
+def _format(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def job_event_stream(
+    job_id: str,
+    get_job: Callable[[str], Optional[Dict[str, Any]]],
+    get_results: Callable[[str, int], List[Tuple[int, Dict[str, Any]]]]
+) -> AsyncIterator[str]:
+    # In-process updates arrive through notify(); the poll timeout picks up
+    # jobs that are running in another worker sharing the job store. Store
+    # reads run in a thread, since they can wait on SQLite's write lock.
+    entry = _subscribe(job_id)
+    _, wakeup = entry
+    seen = 0
+    idle = 0.0
+    try:
+        while True:
+            wakeup.clear()
+            job = await asyncio.to_thread(get_job, job_id)
+            if job is None:
+                yield _format("error", {"detail": "Job not found"})
+                return
+
+            # Results are read after the job, so a finished job's status is
+            # never seen before its last results. Each result is added
+            # together with its progress count, so the count so far is the
+            # progress at that item.
+            for _, result in await asyncio.to_thread(get_results, job_id, seen):
+                seen += 1
+                yield _format("item", {
+                    **result,
+                    "progress": seen,
+                    "total": job["total"]
+                })
+                idle = 0.0
+
+            if job["status"] == JobStatus.COMPLETED:
+                yield _format("completed", {
+                    "job_id": job_id,
+                    "progress": job["progress"],
+                    "total": job["total"],
+                    "download_url": f"/v1/jobs/{job_id}/download"
+                })
+                return
+            if job["status"] == JobStatus.FAILED:
+                yield _format("failed", {"job_id": job_id, "error": job.get("error")})
+                return
+
+            try:
+                await asyncio.wait_for(wakeup.wait(), EVENTS_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                idle += EVENTS_POLL_SECONDS
+                if idle >= EVENTS_KEEPALIVE_SECONDS:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+    finally:
+        _unsubscribe(job_id, entry)
@@ -1,88 +1,460 @@
 import os
+import socket
 import tempfile
 import shutil
-from typing import Dict, List, Any
-from models import JobRequest, JobStatus, JobResult
-from services.google_tts import synthesize_text
-from services.packager import create_zip
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+from config import (
+    ARTIFACT_RETENTION_SECONDS, JOB_ARCHIVE_MAX_BYTES, JOB_WINDOW_ITEMS, TTS_CONCURRENCY,
+    TTS_DOWNLOAD_MODE, TTS_MAX_TEXT_CHARS, WORKER_DEAD_SECONDS
+)
+from models import AudioFormat, JobRequest, JobStatus, JobResult, TTSItem
+from services.google_tts import (
+    AUDIO_FORMATS, VoiceProfile, get_voice, synthesize_cached, synthesize_ssml_cached
+)
+from services.item_spool import ItemSpool
+from services.job_events import notify
+from services.job_store import get_job_store
+from services.metrics import FAILURES, JOB_SECONDS, ZIP_BYTES, ZIP_SECONDS
+from services.mp3 import concat_mp3
+from services.ogg import concat_ogg_opus
+from services.packager import AudioPayload, ZipBuilder, build_timepoints, stream_zip
+from services.text_chunker import split_text
+from services.wav import concat_wav
 
-jobs: Dict[str, Dict[str, Any]] = {}
+store = get_job_store()
 
+# Names this process in the job store. Unfinished jobs carry their owner, and
+# only jobs whose owner stopped sending heartbeats are recovered elsewhere.
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
 
-def create_job(job_id: str, request: JobRequest):
-    jobs[job_id] = {
+# Audio of "stream" mode jobs, held until download by the worker that ran
+# them. Cache hits are copied in too, so a download never depends on a cache
+# entry surviving eviction and never calls the API.
+_audio_buffers: Dict[str, Dict[int, bytes]] = {}
+_timepoint_buffers: Dict[str, Dict[int, List[dict]]] = {}
+
+
+def _update(job_id: str, **fields):
+    store.update(job_id, **fields)
+    notify(job_id)
+
+
+def create_job(job_id: str, request: JobRequest, submitter: str = "",
+               fingerprint: Optional[str] = None, idempotency_key: Optional[str] = None,
+               spool: Optional[ItemSpool] = None):
+    # Spooled jobs keep their items on disk in the work dir and always build
+    # the archive as a file.
+    store.create(job_id, {
         "status": JobStatus.QUEUED,
         "progress": 0,
-        "total": len(request.items),
-        "request": request,
-        "work_dir": None,
+        "total": spool.count if spool else len(request.items),
+        "request": request.model_dump(),
+        "items_path": spool.path if spool else None,
+        "work_dir": spool.work_dir if spool else None,
         "zip_path": None,
-        "results": []
-    }
+        "cache_hits": 0,
+        "cache_misses": 0,
+        "deduplicated": 0,
+        "download_mode": "file" if spool else TTS_DOWNLOAD_MODE,
+        "submitter": submitter,
+        "fingerprint": fingerprint,
+        "idempotency_key": idempotency_key,
+        "owner": OWNER,
+        "created_at": time.time()
+    })
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return store.get(job_id)
+
+
+def get_results(job_id: str, since: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+    return store.results(job_id, since)
+
+
+def heartbeat():
+    store.heartbeat(OWNER)
+
+
+def recover_jobs() -> List[Tuple[str, str]]:
+    """Take over unfinished jobs whose owner has stopped sending heartbeats.
+
+    Returns (job_id, submitter) for queued jobs now owned by this process.
+    Jobs that were mid-run are marked failed, since their partial output (and
+    the in-memory buffers of stream-mode jobs) died with their owner; queued
+    spooled jobs whose item file is gone are failed the same way. Jobs of
+    live workers, including siblings sharing the store, are left alone.
+    """
+    live = store.live_owners(time.time() - WORKER_DEAD_SECONDS) | {OWNER}
+    orphaned = [
+        entry for status in (JobStatus.QUEUED, JobStatus.PROCESSING)
+        for entry in store.find(status=status) if entry[1].get("owner") not in live
+    ]
+    requeue = []
+    for job_id, job in sorted(orphaned, key=lambda entry: entry[1].get("created_at", 0)):
+        expected = {"status": job["status"], "owner": job.get("owner")}
+        if job["status"] == JobStatus.QUEUED:
+            items_path = job.get("items_path")
+            if not items_path or os.path.exists(items_path):
+                # Only one recovering worker wins the owner swap.
+                if store.update_if(job_id, expected, owner=OWNER):
+                    requeue.append((job_id, job.get("submitter", "")))
+                continue
+            error = "Spooled items were lost in a server restart; please resubmit"
+        else:
+            error = "Interrupted by a server restart; please resubmit"
+        if store.update_if(job_id, expected, status=JobStatus.FAILED, error=error,
+                           finished_at=time.time()):
+            FAILURES.inc("job", "restart")
+            notify(job_id)
+    return requeue
+
 
+def expire_queued(job_id: str) -> bool:
+    """Fail a job that is still waiting for a worker.
 
-def get_job(job_id: str) -> Dict[str, Any]:
-    return jobs.get(job_id)
+    A worker that dequeues it later loses the claim and skips it; jobs that
+    are already running are left alone.
+    """
+    if not store.update_if(job_id, {"status": JobStatus.QUEUED}, status=JobStatus.FAILED,
+                           error="Expired before a worker picked it up; please resubmit",
+                           finished_at=time.time()):
+        return False
+    FAILURES.inc("job", "expired")
+    notify(job_id)
+    return True
 
 
-def run_job(job_id: str):
-    job = jobs.get(job_id)
+def _read_payload(audio: AudioPayload) -> bytes:
+    if isinstance(audio, bytes):
+        return audio
+    with audio:
+        return audio.read()
+
+
+_JOINERS = {
+    AudioFormat.MP3: concat_mp3,
+    AudioFormat.OGG_OPUS: concat_ogg_opus,
+    AudioFormat.LINEAR16: concat_wav,
+}
+
+
+def _join_parts(parts: List[AudioPayload], audio_format: AudioFormat) -> AudioPayload:
+    if len(parts) == 1:
+        return parts[0]
+    return _JOINERS[audio_format]([_read_payload(part) for part in parts])
+
+
+def item_voice(item: TTSItem, request: JobRequest) -> VoiceProfile:
+    return get_voice(
+        item.preset or request.preset,
+        item.language or request.language,
+        request.audio_format,
+        request.sample_rate_hertz
+    )
+
+
+def _item_pieces(item: TTSItem) -> List[str]:
+    # SSML cannot be cut without breaking its markup, so it goes out whole.
+    return [item.text] if item.ssml else split_text(item.text, item.max_chars)
+
+
+def _synthesize_piece(piece: str, voice: VoiceProfile, ssml: bool):
+    if ssml:
+        return synthesize_ssml_cached(piece, voice)
+    audio, cached = synthesize_cached(piece, voice)
+    return audio, None, cached
+
+
+def _iter_windows(job: Dict[str, Any], request: JobRequest) -> Iterator[List[Tuple[int, TTSItem]]]:
+    if not job.get("items_path"):
+        yield list(enumerate(request.items))
+        return
+    window = []
+    with open(job["items_path"], encoding="utf-8") as f:
+        for idx, line in enumerate(f):
+            window.append((idx, TTSItem.model_validate_json(line)))
+            if len(window) >= JOB_WINDOW_ITEMS:
+                yield window
+                window = []
+    if window:
+        yield window
+
+
+def run_job(job_id: str, concurrency: int = TTS_CONCURRENCY):
+    # Claiming moves the job out of QUEUED atomically, so a job that reached
+    # two workers' queues (or was removed meanwhile) runs at most once.
+    if not store.update_if(job_id, {"status": JobStatus.QUEUED},
+                           status=JobStatus.PROCESSING, owner=OWNER):
+        return
+    notify(job_id)
+    job = store.get(job_id)
     if not job:
         return
 
-    job["status"] = JobStatus.PROCESSING
-    request: JobRequest = job["request"]
-    results: List[JobResult] = []
+    request = JobRequest.model_validate(job["request"])
+    results: List[JobResult] = [None] * job["total"]
+    window: Dict[int, TTSItem] = {}
 
-    work_dir = tempfile.mkdtemp(prefix=f"tts_{job_id}_")
-    job["work_dir"] = work_dir
+    if job.get("download_mode") == "stream":
+        work_dir = None
+        zip_builder = None
+        buffers = _audio_buffers.setdefault(job_id, {})
+        timepoint_buffers = _timepoint_buffers.setdefault(job_id, {})
+    else:
+        work_dir = job.get("work_dir") or tempfile.mkdtemp(prefix=f"tts_{job_id}_")
+        zip_builder = ZipBuilder(
+            os.path.join(work_dir, f"{job_id}.zip"), max_bytes=JOB_ARCHIVE_MAX_BYTES
+        )
+    if work_dir != job.get("work_dir"):
+        _update(job_id, work_dir=work_dir)
 
-    audio_dir = os.path.join(work_dir, "audio")
-    os.makedirs(audio_dir, exist_ok=True)
+    extension = AUDIO_FORMATS[request.audio_format][1]
+    counts = {"progress": 0, "cache_hits": 0, "cache_misses": 0, "deduplicated": 0}
+    zip_seconds = [0.0]
 
-    for idx, item in enumerate(request.items):
-        try:
-            if len(item.text) > item.max_chars:
-                results.append(JobResult(
-                    item_id=item.id,
-                    success=False,
-                    error=f"Text exceeds max_chars limit: {len(item.text)} > {item.max_chars}"
-                ))
-            else:
-                audio_bytes = synthesize_text(item.text, request.preset)
+    # Results are slotted by request index so the report keeps request order
+    # no matter which item finishes first; audio is appended to the archive
+    # in completion order.
+    def complete(idx: int, result: JobResult, audio: Optional[AudioPayload] = None,
+                 timepoints: Optional[List[dict]] = None):
+        if audio is not None:
+            item_id = window[idx].id
+            if zip_builder is not None:
+                if not (result.duplicate_of and request.dedupe_archive):
+                    started = time.perf_counter()
+                    zip_builder.add_audio(f"{item_id}.{extension}", audio)
+                    if timepoints is not None:
+                        zip_builder.add_audio(f"{item_id}.json", build_timepoints(item_id, timepoints))
+                    zip_seconds[0] += time.perf_counter() - started
+            elif not (result.duplicate_of and request.dedupe_archive):
+                buffers[idx] = _read_payload(audio)
+                if timepoints is not None:
+                    timepoint_buffers[idx] = timepoints
+            elif not isinstance(audio, bytes):
+                audio.close()
+        results[idx] = result
+        if result.duplicate_of:
+            counts["deduplicated"] += 1
+        elif result.success:
+            counts["cache_hits" if result.cached else "cache_misses"] += 1
+        counts["progress"] += 1
+        store.add_result(job_id, idx, result.model_dump(), **counts)
+        notify(job_id)
 
-                filename = f"{item.id}.mp3"
-                file_path = os.path.join(audio_dir, filename)
-                with open(file_path, "wb") as f:
-                    f.write(audio_bytes)
+    parts: Dict[int, List[Any]] = {}
+    timepoints: Dict[int, List[dict]] = {}
+    errors: Dict[int, str] = {}
+    duplicates: Dict[int, List[int]] = {}
 
-                results.append(JobResult(
-                    item_id=item.id,
-                    success=True
+    def finish_item(idx: int):
+        item_parts = parts.pop(idx)
+        item_id = window[idx].id
+        copies = duplicates.get(idx, [])
+        audio = None
+        marks = timepoints.pop(idx, None)
+        error = errors.get(idx)
+        if error is None:
+            try:
+                audio = _join_parts([audio for audio, _ in item_parts], request.audio_format)
+                if copies:
+                    audio = _read_payload(audio)
+            except Exception as e:
+                FAILURES.inc("join", type(e).__name__)
+                error = str(e)
+        if error is not None:
+            for part, _ in item_parts:
+                if part is not None and not isinstance(part, bytes):
+                    part.close()
+            complete(idx, JobResult(item_id=item_id, success=False, error=error))
+            for copy in copies:
+                complete(copy, JobResult(
+                    item_id=window[copy].id,
+                    success=False,
+                    error=error,
+                    duplicate_of=item_id
                 ))
-        except Exception as e:
-            results.append(JobResult(
-                item_id=item.id,
-                success=False,
-                error=str(e)
-            ))
+            return
 
-        job["progress"] = idx + 1
-        job["results"] = results
+        cached = all(cached for _, cached in item_parts)
+        complete(idx, JobResult(item_id=item_id, success=True, cached=cached), audio, marks)
+        for copy in copies:
+            complete(copy, JobResult(
+                item_id=window[copy].id,
+                success=True,
+                cached=cached,
+                duplicate_of=item_id
+            ), audio, marks)
 
     try:
-        zip_path = create_zip(work_dir, job_id, results)
-        job["zip_path"] = zip_path
-        job["status"] = JobStatus.COMPLETED
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            # Long items are split into sentence-bounded pieces that share
+            # the pool with everything else, then joined frame by frame.
+            # Repeated items and repeated pieces are synthesized once and
+            # fanned out to every position that needs them. Items are
+            # submitted grouped by voice so each group shares one set of
+            # request objects.
+            # Spooled jobs are read and scheduled a window at a time, so
+            # memory stays bounded however many items were submitted.
+            for window_items in _iter_windows(job, request):
+                window.clear()
+                window.update(window_items)
+                duplicates.clear()
+                errors.clear()
+                groups: Dict[VoiceProfile, List[int]] = {}
+                for idx, item in window.items():
+                    groups.setdefault(item_voice(item, request), []).append(idx)
+
+                first_seen: Dict[Tuple[str, str, bool], int] = {}
+                piece_futures: Dict[Tuple[str, str, bool], Any] = {}
+                waiters: Dict[Any, List[Tuple[int, int]]] = {}
+                for voice, idx in ((v, i) for v, members in groups.items() for i in members):
+                    item = window[idx]
+                    if len(item.text) > TTS_MAX_TEXT_CHARS:
+                        FAILURES.inc("item", "text_too_long")
+                        complete(idx, JobResult(
+                            item_id=item.id,
+                            success=False,
+                            error=f"Text exceeds limit: {len(item.text)} > {TTS_MAX_TEXT_CHARS}"
+                        ))
+                        continue
+                    item_key = (item.text, voice.voice_name, item.ssml)
+                    if item_key in first_seen:
+                        duplicates.setdefault(first_seen[item_key], []).append(idx)
+                        continue
+                    first_seen[item_key] = idx
+
+                    pieces = _item_pieces(item)
+                    parts[idx] = [None] * len(pieces)
+                    for n, piece in enumerate(pieces):
+                        piece_key = (piece, voice.voice_name, item.ssml)
+                        future = piece_futures.get(piece_key)
+                        if future is None:
+                            future = pool.submit(_synthesize_piece, piece, voice, item.ssml)
+                            piece_futures[piece_key] = future
+                            waiters[future] = []
+                        waiters[future].append((idx, n))
+
+                for future in as_completed(waiters):
+                    targets = waiters.pop(future)
+                    error = None
+                    try:
+                        audio, marks, cached = future.result()
+                        if len(targets) > 1:
+                            audio = _read_payload(audio)
+                    except Exception as e:
+                        FAILURES.inc("synth", type(e).__name__)
+                        audio, marks, cached, error = None, None, False, str(e)
+                    for idx, n in targets:
+                        parts[idx][n] = (audio, cached)
+                        if marks is not None:
+                            timepoints[idx] = marks
+                        if error is not None:
+                            errors.setdefault(idx, error)
+                        if all(part is not None for part in parts[idx]):
+                            finish_item(idx)
+
+        zip_path = None
+        if zip_builder:
+            started = time.perf_counter()
+            zip_path = zip_builder.close(results, request.dedupe_archive)
+            ZIP_SECONDS.observe(zip_seconds[0] + time.perf_counter() - started)
+            ZIP_BYTES.observe(os.path.getsize(zip_path))
+        _update(job_id, zip_path=zip_path, status=JobStatus.COMPLETED, finished_at=time.time())
     except Exception as e:
-        job["status"] = JobStatus.FAILED
-        job["error"] = str(e)
+        FAILURES.inc("job", type(e).__name__)
+        if zip_builder:
+            zip_builder.abort()
+        _update(job_id, status=JobStatus.FAILED, error=str(e), finished_at=time.time())
+    JOB_SECONDS.observe(time.time() - job.get("created_at", time.time()))
+
+
+def _archived(result: JobResult, request: JobRequest) -> bool:
+    return result.success and not (result.duplicate_of and request.dedupe_archive)
+
+
+def _iter_job_audio(request: JobRequest, results: List[JobResult], buffers: Dict[int, bytes],
+                    timepoint_buffers: Dict[int, List[dict]]):
+    extension = AUDIO_FORMATS[request.audio_format][1]
+    for idx, (item, result) in enumerate(zip(request.items, results)):
+        if not _archived(result, request):
+            continue
+        yield f"{item.id}.{extension}", buffers[idx]
+        marks = timepoint_buffers.get(idx)
+        if marks is not None:
+            yield f"{item.id}.json", build_timepoints(item.id, marks)
+
+
+def stream_job_zip(job_id: str, job: Dict[str, Any]) -> Optional[Iterator[bytes]]:
+    """Return the archive of a stream-mode job as chunks, or None when this
+    worker does not hold all of its audio (another worker ran the job, or it
+    was restarted since).
+
+    Checked before any byte is sent, so a client never gets a truncated 200.
+    """
+    request = JobRequest.model_validate(job["request"])
+    results = [
+        JobResult.model_validate(r)
+        for _, r in sorted(store.results(job_id), key=lambda entry: entry[0])
+    ]
+    buffers = _audio_buffers.get(job_id, {})
+    timepoint_buffers = _timepoint_buffers.get(job_id, {})
+    if any(_archived(result, request) and idx not in buffers
+           for idx, result in enumerate(results)):
+        return None
+    return _stream_chunks(job_id, request, results, buffers, timepoint_buffers)
+
+
+def _stream_chunks(job_id: str, request: JobRequest, results: List[JobResult],
+                   buffers: Dict[int, bytes], timepoint_buffers: Dict[int, List[dict]]) -> Iterator[bytes]:
+    chunks = stream_zip(
+        _iter_job_audio(request, results, buffers, timepoint_buffers),
+        results, request.dedupe_archive
+    )
+    # Only time spent producing chunks counts, not time waiting on the client.
+    build_seconds = 0.0
+    size = 0
+    while True:
+        started = time.perf_counter()
+        chunk = next(chunks, None)
+        build_seconds += time.perf_counter() - started
+        if chunk is None:
+            break
+        size += len(chunk)
+        yield chunk
+    ZIP_SECONDS.observe(build_seconds)
+    ZIP_BYTES.observe(size)
+    mark_downloaded(job_id)
+
+
+def mark_downloaded(job_id: str):
+    # Artifacts outlive the first download so an interrupted transfer can
+    # resume; the reaper removes them once the retention window passes.
+    if ARTIFACT_RETENTION_SECONDS <= 0:
+        cleanup_job(job_id)
+        return
+    job = store.get(job_id)
+    if job and not job.get("downloaded_at"):
+        _update(job_id, downloaded_at=time.time())
+
+
+def drop_orphan_buffers(live_job_ids):
+    for job_id in list(_audio_buffers):
+        if job_id not in live_job_ids:
+            _audio_buffers.pop(job_id, None)
+            _timepoint_buffers.pop(job_id, None)
 
 
 def cleanup_job(job_id: str):
-    job = jobs.get(job_id)
-    if job and job.get("work_dir"):
-        work_dir = job["work_dir"]
-        if os.path.exists(work_dir):
-            shutil.rmtree(work_dir)
-        del jobs[job_id]
+    job = store.get(job_id)
+    if not job:
+        return
+    work_dir = job.get("work_dir")
+    if work_dir and os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    _audio_buffers.pop(job_id, None)
+    _timepoint_buffers.pop(job_id, None)
+    store.delete(job_id)
@@ -0,0 +1,346 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set, Tuple
+from config import JOB_STORE_BACKEND, JOB_STORE_PATH
+
+# Job fields that find() and update_if() can match on; SQLite keeps them in
+# indexed columns.
+LOOKUP_FIELDS = ("submitter", "fingerprint", "idempotency_key", "status", "owner")
+
+
+class JobStore(ABC):
+    @abstractmethod
+    def create(self, job_id: str, job: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update(self, job_id: str, **fields):
+        ...
+
+    @abstractmethod
+    def update_if(self, job_id: str, expected: Dict[str, Any], **fields) -> bool:
+        """Apply fields only if the job's LOOKUP_FIELDS match expected."""
+
+    @abstractmethod
+    def delete(self, job_id: str):
+        ...
+
+    @abstractmethod
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        ...
+
+    @abstractmethod
+    def add_result(self, job_id: str, idx: int, result: Dict[str, Any], **counters):
+        """Append one item's result and set the job's counters (progress etc.)."""
+
+    @abstractmethod
+    def results(self, job_id: str, since: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        """(item index, result) pairs in the order they were added, skipping
+        the first since."""
+
+    @abstractmethod
+    def find(self, **fields) -> List[Tuple[str, Dict[str, Any]]]:
+        """Jobs whose LOOKUP_FIELDS equal the given values, newest first."""
+
+    @abstractmethod
+    def heartbeat(self, owner: str):
+        """Record that the worker process named owner is alive."""
+
+    @abstractmethod
+    def live_owners(self, since: float) -> Set[str]:
+        """Owners with a heartbeat at or after since."""
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._results: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        self._heartbeats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, job: Dict[str, Any]):
+        with self._lock:
+            self._jobs[job_id] = dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def update_if(self, job_id: str, expected: Dict[str, Any], **fields) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or any(job.get(name) != value for name, value in expected.items()):
+                return False
+            job.update(fields)
+            return True
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            self._results.pop(job_id, None)
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            return [(job_id, dict(job)) for job_id, job in self._jobs.items()]
+
+    def add_result(self, job_id: str, idx: int, result: Dict[str, Any], **counters):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(counters)
+                self._results.setdefault(job_id, []).append((idx, dict(result)))
+
+    def results(self, job_id: str, since: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            return list(self._results.get(job_id, [])[since:])
+
+    def find(self, **fields) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            found = [
+                (job_id, dict(job)) for job_id, job in self._jobs.items()
+                if all(job.get(name) == value for name, value in fields.items())
+            ]
+        return sorted(found, key=lambda entry: entry[1].get("created_at", 0), reverse=True)
+
+    def heartbeat(self, owner: str):
+        with self._lock:
+            self._heartbeats[owner] = time.time()
+
+    def live_owners(self, since: float) -> Set[str]:
+        with self._lock:
+            return {owner for owner, seen in self._heartbeats.items() if seen >= since}
+
+
+class SQLiteJobStore(JobStore):
+    # One connection per thread; WAL lets status polls from other workers
+    # read while the runner is writing progress. Item results and counters
+    # live outside the job's JSON, so recording one item costs the same
+    # however many came before it.
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        # Workers sharing the file record liveness here, so a restarting
+        # one can tell jobs of a dead worker from jobs a sibling still holds.
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS owners ("
+            " owner TEXT PRIMARY KEY,"
+            " heartbeat_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " job_id TEXT NOT NULL,"
+            " seq INTEGER NOT NULL,"
+            " idx INTEGER NOT NULL,"
+            " data TEXT NOT NULL,"
+            " PRIMARY KEY (job_id, seq))"
+        )
+        self._add_lookup_columns(conn)
+        self._move_results(conn)
+
+    def _add_lookup_columns(self, conn: sqlite3.Connection):
+        # Lookups go through the database rather than a per-process index,
+        # so every worker sharing the file sees the same jobs. Tables from
+        # before these columns existed are backfilled from the JSON.
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        missing = [name for name in LOOKUP_FIELDS if name not in existing]
+        if missing:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for name in missing:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} TEXT")
+                for job_id, data in conn.execute("SELECT job_id, data FROM jobs").fetchall():
+                    job = json.loads(data)
+                    conn.execute(
+                        f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in missing)}"
+                        " WHERE job_id = ?",
+                        tuple(job.get(name) for name in missing) + (job_id,)
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (submitter, fingerprint)"
+        )
+        conn.execute("DROP INDEX IF EXISTS jobs_submitter_key")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_idempotency_key ON jobs (idempotency_key)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, owner)")
+
+    def _move_results(self, conn: sqlite3.Connection):
+        # Older tables kept results and counters inside the job's JSON.
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "counters" in existing:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("ALTER TABLE jobs ADD COLUMN counters TEXT")
+            for job_id, data in conn.execute("SELECT job_id, data FROM jobs").fetchall():
+                job = json.loads(data)
+                conn.executemany(
+                    "INSERT OR REPLACE INTO results (job_id, seq, idx, data) VALUES (?, ?, ?, ?)",
+                    [
+                        (job_id, seq, seq - 1, json.dumps(result))
+                        for seq, result in enumerate(job.pop("results", []), 1)
+                    ]
+                )
+                conn.execute(
+                    "UPDATE jobs SET data = ? WHERE job_id = ?", (json.dumps(job), job_id)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _load(data: str, counters: Optional[str]) -> Dict[str, Any]:
+        job = json.loads(data)
+        if counters:
+            job.update(json.loads(counters))
+        return job
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, job_id: str, job: Dict[str, Any]):
+        now = time.time()
+        self._conn().execute(
+            f"INSERT OR REPLACE INTO jobs (job_id, data, created_at, updated_at,"
+            f" {', '.join(LOOKUP_FIELDS)})"
+            f" VALUES (?, ?, ?, ?{', ?' * len(LOOKUP_FIELDS)})",
+            (job_id, json.dumps(job), now, now) + tuple(job.get(name) for name in LOOKUP_FIELDS)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT data, counters FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return self._load(*row) if row else None
+
+    def update(self, job_id: str, **fields):
+        self.update_if(job_id, {}, **fields)
+
+    def update_if(self, job_id: str, expected: Dict[str, Any], **fields) -> bool:
+        # The read and the write share one write transaction, so two workers
+        # racing on the same expected state cannot both succeed.
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            job = json.loads(row[0]) if row else None
+            matched = job is not None and all(
+                job.get(name) == value for name, value in expected.items()
+            )
+            if matched:
+                job.update(fields)
+                columns = [name for name in LOOKUP_FIELDS if name in fields]
+                conn.execute(
+                    f"UPDATE jobs SET data = ?, updated_at = ?"
+                    f"{''.join(f', {name} = ?' for name in columns)} WHERE job_id = ?",
+                    (json.dumps(job), time.time())
+                    + tuple(fields[name] for name in columns) + (job_id,)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return matched
+
+    def delete(self, job_id: str):
+        conn = self._conn()
+        conn.execute("DELETE FROM results WHERE job_id = ?", (job_id,))
+        conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        rows = self._conn().execute("SELECT job_id, data, counters FROM jobs").fetchall()
+        return [(job_id, self._load(data, counters)) for job_id, data, counters in rows]
+
+    def add_result(self, job_id: str, idx: int, result: Dict[str, Any], **counters):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO results (job_id, seq, idx, data)"
+                " SELECT ?, COALESCE(MAX(seq), 0) + 1, ?, ? FROM results WHERE job_id = ?",
+                (job_id, idx, json.dumps(result), job_id)
+            )
+            conn.execute(
+                "UPDATE jobs SET counters = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(counters), time.time(), job_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def results(self, job_id: str, since: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+        rows = self._conn().execute(
+            "SELECT idx, data FROM results WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, since)
+        ).fetchall()
+        return [(idx, json.loads(data)) for idx, data in rows]
+
+    def find(self, **fields) -> List[Tuple[str, Dict[str, Any]]]:
+        unknown = set(fields) - set(LOOKUP_FIELDS)
+        if unknown:
+            raise ValueError(f"Not a lookup field: {', '.join(sorted(unknown))}")
+        where = " AND ".join(f"{name} = ?" for name in fields) or "1"
+        rows = self._conn().execute(
+            f"SELECT job_id, data, counters FROM jobs WHERE {where} ORDER BY created_at DESC",
+            tuple(fields.values())
+        ).fetchall()
+        return [(job_id, self._load(data, counters)) for job_id, data, counters in rows]
+
+    def heartbeat(self, owner: str):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO owners (owner, heartbeat_at) VALUES (?, ?)",
+            (owner, time.time())
+        )
+
+    def live_owners(self, since: float) -> Set[str]:
+        rows = self._conn().execute(
+            "SELECT owner FROM owners WHERE heartbeat_at >= ?", (since,)
+        ).fetchall()
+        return {row[0] for row in rows}
+
+
+_store: Optional[JobStore] = None
+
+
+def get_job_store() -> JobStore:
+    global _store
+    if _store is None:
+        if JOB_STORE_BACKEND == "memory":
+            _store = MemoryJobStore()
+        else:
+            _store = SQLiteJobStore(JOB_STORE_PATH)
+    return _store
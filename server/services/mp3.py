@@ -0,0 +1,76 @@
+from typing import Iterator, List, Tuple
+
+# kbps by [mpeg1][layer3]; index 0 is "free", 15 is invalid.
+_BITRATES_V1_L3 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
+_BITRATES_V2_L3 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0]
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if len(data) >= 10 and data[:3] == b"ID3":
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _frame_length(header: bytes) -> int:
+    if header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return 0
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_idx = (header[2] >> 4) & 0x0F
+    rate_idx = (header[2] >> 2) & 0x03
+    padding = (header[2] >> 1) & 0x01
+    if version == 1 or layer != 1 or rate_idx == 3:
+        return 0
+    bitrates = _BITRATES_V1_L3 if version == 3 else _BITRATES_V2_L3
+    bitrate = bitrates[bitrate_idx] * 1000
+    if not bitrate:
+        return 0
+    sample_rate = _SAMPLE_RATES[version][rate_idx]
+    coefficient = 144 if version == 3 else 72
+    return coefficient * bitrate // sample_rate + padding
+
+
+def iter_frames(data: bytes) -> Iterator[Tuple[int, int]]:
+    """Yield (offset, length) for each MPEG Layer III frame in data."""
+    pos = _skip_id3v2(data)
+    end = len(data)
+    if end >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    while pos + 4 <= end:
+        length = _frame_length(data[pos:pos + 4])
+        if length and pos + length <= end:
+            yield pos, length
+            pos += length
+        else:
+            pos += 1
+
+
+def _is_info_frame(frame: memoryview) -> bool:
+    # Xing/Info/VBRI headers carry a frame count for the whole stream and
+    # would report the wrong duration once streams are joined.
+    head = bytes(frame[:64])
+    return b"Xing" in head or b"Info" in head or b"VBRI" in head
+
+
+def concat_mp3(parts: List[bytes]) -> bytes:
+    """Join MP3 streams frame by frame, dropping tags and VBR info frames."""
+    out = bytearray()
+    for data in parts:
+        view = memoryview(data)
+        frames = list(iter_frames(data))
+        if not frames:
+            out += view[_skip_id3v2(data):]
+            continue
+        offset, length = frames[0]
+        if _is_info_frame(view[offset:offset + length]):
+            frames = frames[1:]
+        for offset, length in frames:
+            out += view[offset:offset + length]
+    return bytes(out)
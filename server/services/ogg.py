@@ -0,0 +1,103 @@
+import struct
+from typing import Iterator, List, Tuple
+
+_CONTINUED = 0x01
+_BOS = 0x02
+_EOS = 0x04
+_NO_GRANULE = -1
+
+
+def _crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else (crc << 1)
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def page_crc(data: bytes) -> int:
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
+def iter_pages(data: bytes) -> Iterator[Tuple[int, int]]:
+    """Yield (offset, length) for each Ogg page in data."""
+    pos = 0
+    while pos + 27 <= len(data):
+        if data[pos:pos + 4] != b"OggS":
+            pos += 1
+            continue
+        segments = data[pos + 26]
+        if pos + 27 + segments > len(data):
+            return
+        length = 27 + segments + sum(data[pos + 27:pos + 27 + segments])
+        if pos + length > len(data):
+            return
+        yield pos, length
+        pos += length
+
+
+def concat_ogg_opus(parts: List[bytes]) -> bytes:
+    """Join Ogg Opus streams into one logical stream.
+
+    Later streams lose their OpusHead/OpusTags pages and are re-serialized
+    under the first stream's serial number with granule positions shifted
+    past everything before them. Only the first stream's pre-skip survives
+    in the joined header, so each later stream's own pre-skip is taken off
+    its granules.
+    """
+    pages = []
+    serial = None
+    granule_offset = 0
+    for n, data in enumerate(parts):
+        view = memoryview(data)
+        headers_left = 2 if n else 0
+        last_granule = 0
+        pre_skip = 0
+        found = False
+        for offset, length in iter_pages(data):
+            found = True
+            page = view[offset:offset + length]
+            segments = page[26]
+            lacing = page[27:27 + segments]
+            if serial is None:
+                serial = struct.unpack_from("<I", page, 14)[0]
+            body = page[27 + segments:]
+            if n and body[:8] == b"OpusHead":
+                pre_skip = struct.unpack_from("<H", body, 10)[0]
+            if headers_left:
+                headers_left -= sum(1 for size in lacing if size < 255)
+                continue
+            granule = struct.unpack_from("<q", page, 6)[0]
+            if granule != _NO_GRANULE:
+                last_granule = granule
+                granule += granule_offset - pre_skip
+            flags = page[5] & _CONTINUED
+            if not pages:
+                flags |= _BOS
+            pages.append((flags, granule, page[26:]))
+        if not found:
+            pages.append((None, None, view))
+        granule_offset += last_granule - pre_skip
+
+    out = bytearray()
+    for seq, (flags, granule, body) in enumerate(pages):
+        if flags is None:
+            out += body
+            continue
+        if seq == len(pages) - 1:
+            flags |= _EOS
+        page = bytearray(b"OggS\x00")
+        page.append(flags)
+        page += struct.pack("<qIII", granule, serial, seq, 0)
+        page += body
+        struct.pack_into("<I", page, 22, page_crc(page))
+        out += page
+    return bytes(out)
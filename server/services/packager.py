@@ -1,30 +1,141 @@
+import json
 import os
+import shutil
+import time
 import zipfile
-from typing import List
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+from config import DOWNLOAD_CHUNK_SIZE
 from models import JobResult
 
+COPY_CHUNK_SIZE = 1024 * 1024
+SMALL_WRITE_SIZE = 64 * 1024
 
-def create_zip(work_dir: str, job_id: str, results: List[JobResult]) -> str:
-    zip_path = os.path.join(work_dir, f"{job_id}.zip")
+AudioPayload = Union[bytes, BinaryIO]
 
-    audio_dir = os.path.join(work_dir, "audio")
-    logs_dir = os.path.join(work_dir, "logs")
 
-    os.makedirs(logs_dir, exist_ok=True)
+class ArchiveTooLarge(Exception):
+    pass
 
-    report_path = os.path.join(logs_dir, "report.csv")
-    with open(report_path, "w", encoding="utf-8") as f:
-        f.write("item_id,success,error\n")
-        for result in results:
-            error = result.error.replace(",", ";") if result.error else ""
-            f.write(f"{result.item_id},{result.success},{error}\n")
 
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        if os.path.exists(audio_dir):
-            for filename in sorted(os.listdir(audio_dir)):
-                file_path = os.path.join(audio_dir, filename)
-                zf.write(file_path, f"audio/{filename}")
+def build_report(results: List[JobResult]) -> str:
+    lines = ["item_id,success,error\n"]
+    for result in results:
+        error = result.error.replace(",", ";") if result.error else ""
+        lines.append(f"{result.item_id},{result.success},{error}\n")
+    return "".join(lines)
 
-        zf.write(report_path, "logs/report.csv")
 
-    return zip_path
+def build_duplicates_report(results: List[JobResult]) -> str:
+    lines = ["item_id,duplicate_of\n"]
+    for result in results:
+        if result.success and result.duplicate_of:
+            lines.append(f"{result.item_id},{result.duplicate_of}\n")
+    return "".join(lines)
+
+
+def build_timepoints(item_id: str, timepoints: List[dict]) -> bytes:
+    return json.dumps(
+        {"item_id": item_id, "timepoints": timepoints}, ensure_ascii=False
+    ).encode("utf-8")
+
+
+class ZipBuilder:
+    # Encoded audio gains little from deflate, so audio entries are STORED and
+    # appended as soon as each item finishes; only the small CSV report is
+    # deflated. With max_bytes, adding audio past that many bytes raises
+    # ArchiveTooLarge.
+    def __init__(self, target: Union[str, BinaryIO], max_bytes: int = 0):
+        self.zip_path = target if isinstance(target, str) else None
+        self.audio_bytes = 0
+        self._max_bytes = max_bytes
+        self._zf = zipfile.ZipFile(target, "w", zipfile.ZIP_STORED)
+
+    def _info(self, arcname: str, compress_type: int) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+        info.compress_type = compress_type
+        return info
+
+    def add_audio(self, filename: str, payload: AudioPayload):
+        info = self._info(f"audio/{filename}", zipfile.ZIP_STORED)
+        if isinstance(payload, (bytes, bytearray, memoryview)):
+            self._zf.writestr(info, payload)
+        else:
+            with payload, self._zf.open(info, "w") as dest:
+                shutil.copyfileobj(payload, dest, COPY_CHUNK_SIZE)
+        self.audio_bytes += info.file_size
+        if self._max_bytes and self.audio_bytes > self._max_bytes:
+            raise ArchiveTooLarge(
+                f"Archive exceeds {self._max_bytes} bytes; split the batch into smaller jobs"
+            )
+
+    def close(self, results: List[JobResult], dedupe_archive: bool = False) -> Optional[str]:
+        # With dedupe_archive, duplicate items have no audio entry of their
+        # own; logs/duplicates.csv maps them to the entry they share.
+        if dedupe_archive and any(r.success and r.duplicate_of for r in results):
+            info = self._info("logs/duplicates.csv", zipfile.ZIP_DEFLATED)
+            self._zf.writestr(info, build_duplicates_report(results).encode("utf-8"))
+        info = self._info("logs/report.csv", zipfile.ZIP_DEFLATED)
+        self._zf.writestr(info, build_report(results).encode("utf-8"))
+        self._zf.close()
+        return self.zip_path
+
+    def abort(self):
+        # A failed job's partial archive is of no use, so its space is
+        # released now rather than when the job is reaped.
+        self._zf.close()
+        if self.zip_path:
+            try:
+                os.remove(self.zip_path)
+            except OSError:
+                pass
+
+
+class _ChunkSink:
+    # Write-only, non-seekable target for ZipFile. Buffers are kept by
+    # reference so payload bytes reach the response without being copied.
+    def __init__(self):
+        self._pending: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._pending.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self, chunk_size: int) -> Iterator[bytes]:
+        pending, self._pending = self._pending, []
+        small = bytearray()
+        for data in pending:
+            if len(data) < SMALL_WRITE_SIZE:
+                small += data
+                if len(small) >= chunk_size:
+                    yield bytes(small)
+                    small = bytearray()
+                continue
+            if small:
+                yield bytes(small)
+                small = bytearray()
+            if isinstance(data, bytes) and len(data) <= chunk_size:
+                yield data
+                continue
+            view = memoryview(data)
+            for start in range(0, len(view), chunk_size):
+                yield view[start:start + chunk_size].tobytes()
+        if small:
+            yield bytes(small)
+
+
+def stream_zip(
+    entries: Iterable[Tuple[str, AudioPayload]],
+    results: List[JobResult],
+    dedupe_archive: bool = False,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE
+) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    builder = ZipBuilder(sink)
+    for filename, payload in entries:
+        builder.add_audio(filename, payload)
+        yield from sink.drain(chunk_size)
+    builder.close(results, dedupe_archive)
+    yield from sink.drain(chunk_size)
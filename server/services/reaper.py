@@ -0,0 +1,118 @@
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Optional
+from config import (
+    ARTIFACT_RETENTION_SECONDS, JOB_DISK_MAX_BYTES, JOB_MAX_AGE_SECONDS,
+    JOB_REAP_INTERVAL, JOB_TTL_SECONDS, TTS_CACHE_DIR
+)
+from models import JobStatus
+from services.job_runner import cleanup_job, drop_orphan_buffers, expire_queued, store
+from services.metrics import dir_bytes
+
+logger = logging.getLogger(__name__)
+
+# Work dirs younger than this are left alone by the orphan sweep: another
+# worker may have created one and not yet recorded it in the job store.
+ORPHAN_GRACE_SECONDS = 300
+
+_FINISHED = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+
+def sweep_jobs(now: Optional[float] = None) -> int:
+    now = time.time() if now is None else now
+    reaped = 0
+    finished = []
+    live = set()
+
+    for job_id, job in store.items():
+        created = job.get("created_at", now)
+        done = job["status"] in _FINISHED
+        finished_at = job.get("finished_at") or created
+        downloaded_at = job.get("downloaded_at")
+        # Unfinished jobs are never deleted here: a queued one past the age
+        # limit is failed instead (and reaped once its TTL passes), and a
+        # running one is left to finish or to be failed by recovery.
+        expired = done and (
+            now - finished_at > JOB_TTL_SECONDS
+            or (downloaded_at and now - downloaded_at > ARTIFACT_RETENTION_SECONDS)
+            or now - created > JOB_MAX_AGE_SECONDS
+        )
+        if expired:
+            cleanup_job(job_id)
+            reaped += 1
+            continue
+        live.add(job_id)
+        if job["status"] == JobStatus.QUEUED and now - created > JOB_MAX_AGE_SECONDS:
+            expire_queued(job_id)
+        if done and job.get("work_dir"):
+            finished.append((finished_at, job_id, job["work_dir"]))
+
+    # Over the disk ceiling: drop finished jobs oldest first, downloaded or
+    # not. Queued and running jobs are never evicted.
+    sizes = {job_id: dir_bytes(work_dir) for _, job_id, work_dir in finished}
+    total = sum(sizes.values())
+    for _, job_id, _ in sorted(finished):
+        if total <= JOB_DISK_MAX_BYTES:
+            break
+        cleanup_job(job_id)
+        live.discard(job_id)
+        total -= sizes[job_id]
+        reaped += 1
+
+    drop_orphan_buffers(live)
+    return reaped
+
+
+def sweep_orphan_dirs(now: Optional[float] = None) -> int:
+    now = time.time() if now is None else now
+    known = {job.get("work_dir") for _, job in store.items()}
+    removed = 0
+    with os.scandir(tempfile.gettempdir()) as entries:
+        for entry in entries:
+            if not entry.name.startswith("tts_") or entry.path == TTS_CACHE_DIR:
+                continue
+            if not entry.is_dir(follow_symlinks=False) or entry.path in known:
+                continue
+            try:
+                if now - entry.stat().st_mtime < ORPHAN_GRACE_SECONDS:
+                    continue
+                shutil.rmtree(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+class JobReaper:
+    def __init__(self, interval: float = JOB_REAP_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        try:
+            removed = sweep_orphan_dirs()
+            if removed:
+                logger.info("Removed %d orphaned work dirs", removed)
+        except Exception:
+            logger.exception("Orphan sweep failed")
+        self._thread = threading.Thread(target=self._loop, name="tts-reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                sweep_jobs()
+            except Exception:
+                logger.exception("Job sweep failed")
@@ -0,0 +1,146 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from config import JOB_QUEUE_MAX, JOB_WORKERS, WORKER_HEARTBEAT_SECONDS
+from services.job_runner import heartbeat, recover_jobs, run_job
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("Job queue is full")
+        self.retry_after = retry_after
+
+
+class JobScheduler:
+    # Jobs wait in one FIFO per submitter and workers take from the
+    # submitters in turn, so one client's large backlog cannot starve
+    # another's single job.
+    # A keepalive thread reports this process as alive to the job store and
+    # adopts queued jobs left behind by workers that died.
+    def __init__(self, run: Callable[[str], None], workers: int, max_queued: int,
+                 heartbeat: Optional[Callable[[], None]] = None,
+                 recover: Optional[Callable[[], List[Tuple[str, str]]]] = None,
+                 heartbeat_interval: float = WORKER_HEARTBEAT_SECONDS):
+        self._run = run
+        self._heartbeat = heartbeat
+        self._recover = recover
+        self._heartbeat_interval = heartbeat_interval
+        self._workers = max(1, workers)
+        self._max_queued = max_queued
+        self._queues: "OrderedDict[str, Deque[str]]" = OrderedDict()
+        self._queued = 0
+        self._active = 0
+        self._avg_seconds = 30.0
+        self._cond = threading.Condition()
+        # Separate from _cond: submit() wakes a single waiter, which must be
+        # a worker rather than the keepalive thread.
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            self._stop_event.clear()
+            for n in range(self._workers):
+                thread = threading.Thread(
+                    target=self._worker, name=f"tts-job-{n}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            if self._heartbeat or self._recover:
+                thread = threading.Thread(
+                    target=self._keepalive, name="tts-keepalive", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._stop_event.set()
+        self._threads = []
+
+    def submit(self, job_id: str, submitter: str, force: bool = False):
+        # force skips the queue limit, for jobs accepted before a restart.
+        with self._cond:
+            if self._queued >= self._max_queued and not force:
+                raise QueueFull(self._retry_after())
+            self._queues.setdefault(submitter, deque()).append(job_id)
+            self._queued += 1
+            self._cond.notify()
+
+    def _retry_after(self) -> int:
+        waves = (self._queued + self._active) / self._workers
+        return max(1, math.ceil(self._avg_seconds * waves))
+
+    def _next_job(self) -> Optional[str]:
+        with self._cond:
+            while not self._queued and not self._stopping:
+                self._cond.wait()
+            if self._stopping:
+                return None
+            submitter, queue = next(iter(self._queues.items()))
+            job_id = queue.popleft()
+            del self._queues[submitter]
+            if queue:
+                self._queues[submitter] = queue
+            self._queued -= 1
+            self._active += 1
+            return job_id
+
+    def _keepalive(self):
+        while True:
+            try:
+                if self._heartbeat:
+                    self._heartbeat()
+                for job_id, submitter in self._recover() if self._recover else ():
+                    self.submit(job_id, submitter, force=True)
+            except Exception:
+                logger.exception("Job store heartbeat failed")
+            if self._stop_event.wait(self._heartbeat_interval):
+                return
+
+    def _worker(self):
+        while True:
+            job_id = self._next_job()
+            if job_id is None:
+                return
+            started = time.monotonic()
+            try:
+                self._run(job_id)
+            except Exception:
+                logger.exception("Job %s crashed", job_id)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self._active -= 1
+                    self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "queue_depth": self._queued,
+                "active_jobs": self._active,
+                "workers": self._workers,
+            }
+
+
+_scheduler: Optional[JobScheduler] = None
+
+
+def get_scheduler() -> JobScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = JobScheduler(
+            run_job, JOB_WORKERS, JOB_QUEUE_MAX, heartbeat=heartbeat, recover=recover_jobs
+        )
+    return _scheduler
@@ -0,0 +1,47 @@
+import re
+from typing import List
+
+# Sentence ends (ASCII/full-width punctuation, ellipsis) or line breaks.
+_SENTENCE_END = re.compile(r"(?<=[.!?…。！？])\s+|\n+")
+_CLAUSE_END = re.compile(r"(?<=[,;:、，])\s+")
+
+
+def _pack(parts: List[str], max_chars: int, sep: str) -> List[str]:
+    pieces: List[str] = []
+    current = ""
+    for part in parts:
+        candidate = f"{current}{sep}{part}" if current else part
+        if len(candidate) <= max_chars:
+            current = candidate
+            continue
+        if current:
+            pieces.append(current)
+        current = part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    if len(sentence) <= max_chars:
+        return [sentence]
+    for pattern, sep in ((_CLAUSE_END, " "), (re.compile(r"\s+"), " ")):
+        parts = [p for p in pattern.split(sentence) if p]
+        if len(parts) > 1:
+            pieces = []
+            for piece in _pack(parts, max_chars, sep):
+                pieces.extend(_split_long(piece, max_chars))
+            return pieces
+    return [sentence[i:i + max_chars] for i in range(0, len(sentence), max_chars)]
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+
+    sentences: List[str] = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if sentence:
+            sentences.extend(_split_long(sentence, max_chars))
+    return _pack(sentences, max_chars, " ")
@@ -0,0 +1,107 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Optional
+from config import TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES
+
+_lock = threading.Lock()
+_index: Optional["OrderedDict[str, int]"] = None
+_total_bytes = 0
+
+
+def cache_key(text: str, voice_name: str, encoding: str) -> str:
+    h = hashlib.sha256()
+    for part in (text, voice_name, encoding):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(TTS_CACHE_DIR, key[:2], key)
+
+
+def _load_index():
+    global _index, _total_bytes
+    if _index is not None:
+        return
+    entries = []
+    if os.path.isdir(TTS_CACHE_DIR):
+        for root, _, files in os.walk(TTS_CACHE_DIR):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, name, st.st_size))
+    entries.sort()
+    _index = OrderedDict((name, size) for _, name, size in entries)
+    _total_bytes = sum(_index.values())
+
+
+def _forget(key: str):
+    global _total_bytes
+    _total_bytes -= _index.pop(key, 0)
+
+
+def _evict():
+    global _total_bytes
+    while _total_bytes > TTS_CACHE_MAX_BYTES and _index:
+        key, size = _index.popitem(last=False)
+        _total_bytes -= size
+        try:
+            os.remove(_entry_path(key))
+        except OSError:
+            pass
+
+
+def total_bytes() -> int:
+    with _lock:
+        _load_index()
+        return _total_bytes
+
+
+def open_entry(key: str) -> Optional[BinaryIO]:
+    # The returned handle stays readable even if the entry is evicted
+    # before the caller has finished streaming it.
+    if TTS_CACHE_MAX_BYTES <= 0:
+        return None
+    with _lock:
+        _load_index()
+        if key not in _index:
+            return None
+        path = _entry_path(key)
+        try:
+            f = open(path, "rb")
+            os.utime(path)
+        except OSError:
+            _forget(key)
+            return None
+        _index.move_to_end(key)
+        return f
+
+
+def put(key: str, data: bytes):
+    global _total_bytes
+    if TTS_CACHE_MAX_BYTES <= 0:
+        return
+    path = _entry_path(key)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        return
+    with _lock:
+        _load_index()
+        if key in _index:
+            _index.move_to_end(key)
+            return
+        _index[key] = len(data)
+        _total_bytes += len(data)
+        _evict()
@@ -0,0 +1,40 @@
+import struct
+from typing import Iterator, List, Tuple
+
+
+def iter_chunks(data: bytes) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (chunk_id, offset, length) for each RIFF sub-chunk in data."""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        length = struct.unpack_from("<I", data, pos + 4)[0]
+        start = pos + 8
+        # Streamed WAV writers leave the data size at 0 or 0xFFFFFFFF.
+        if chunk_id == b"data" and (length == 0 or start + length > len(data)):
+            length = len(data) - start
+        yield chunk_id, start, length
+        pos = start + length + (length & 1)
+
+
+def concat_wav(parts: List[bytes]) -> bytes:
+    """Join LINEAR16 WAV files sharing one format into a single file."""
+    fmt = None
+    samples = bytearray()
+    for data in parts:
+        view = memoryview(data)
+        found = False
+        for chunk_id, offset, length in iter_chunks(data):
+            if chunk_id == b"fmt " and fmt is None:
+                fmt = bytes(view[offset:offset + length])
+            elif chunk_id == b"data":
+                samples += view[offset:offset + length]
+                found = True
+        if not found:
+            samples += view
+    if fmt is None:
+        return bytes(samples)
+    header = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    header += b"data" + struct.pack("<I", len(samples))
+    return b"RIFF" + struct.pack("<I", len(header) + len(samples)) + header + bytes(samples)